@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark das consultas do portfólio público: modo sequencial vs $facet concorrente
+
+Uso: python bench_portfolio.py [iterações]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from utils.database import connect_to_mongo, close_mongo_connection
+from services.portfolio import build_portfolio_payload
+
+MODES = ["sequential", "facet"]
+
+
+def percentile(samples, pct):
+    """Percentil por rank mais próximo"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_mode(mode: str, iterations: int):
+    """Executa o build do payload N vezes e retorna latências em ms"""
+    # Aquecimento (conexões do pool e cache do servidor)
+    for _ in range(5):
+        await build_portfolio_payload(mode)
+    
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await build_portfolio_payload(mode)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    
+    await connect_to_mongo()
+    try:
+        print(f"{'modo':<12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'média':>10}")
+        for mode in MODES:
+            samples = await run_mode(mode, iterations)
+            print(
+                f"{mode:<12}"
+                f"{percentile(samples, 50):>10.2f}"
+                f"{percentile(samples, 99):>10.2f}"
+                f"{statistics.mean(samples):>10.2f}"
+            )
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
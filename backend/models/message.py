@@ -12,6 +12,7 @@ class ContactMessage(BaseModel):
     message: str
     read: bool = False
     replied: bool = False
+    emailsQueued: bool = False  # emails já na fila (senão o worker enfileira)
     createdAt: datetime = Field(default_factory=datetime.utcnow)
 
 class ContactMessageCreate(BaseModel):
@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import uuid
+
+class UploadSession(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    filename: str
+    folder: str
+    kind: str
+    contentType: str
+    size: int
+    chunkSize: int
+    totalChunks: int
+    sha256: Optional[str] = None
+    receivedChunks: List[int] = Field(default_factory=list)
+    chunkLeases: Dict[str, Any] = Field(default_factory=dict)  # bloco -> {token, until}
+    completeLease: Optional[Dict[str, Any]] = None  # finalização em andamento: {token, until}
+    status: str = "open"
+    url: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+    expiresAt: datetime
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    contentType: str
+    sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")
+    chunkSize: Optional[int] = None
+    folder: str = "gaffer-portfolio/videos"
+
+class DirectUpload(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    filename: str
+    folder: str
+    kind: str
+    contentType: str
+    size: int
+    sha256: str
+    backend: str
+    key: str
+    status: str = "pending"
+    url: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    expiresAt: datetime
+
+class DirectUploadCreate(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    contentType: str
+    sha256: str = Field(pattern=r"^[0-9a-fA-F]{64}$")
+    folder: str = "gaffer-portfolio"
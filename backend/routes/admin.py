@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Optional
+import time
 import logging
 from datetime import datetime
 
@@ -10,15 +11,25 @@ from models.project import Project, ProjectCreate, ProjectUpdate
 from models.client import Client, ClientCreate, ClientUpdate
 from models.message import ContactMessage, ContactMessageUpdate
 from services.auth import (
-    hash_password, verify_password, create_access_token, 
-    verify_token, create_admin_response
+    hash_password, verify_password_async, hash_password_async,
+    password_needs_rehash, create_access_token,
+    verify_token, create_admin_response,
+    principal_cache, invalidate_admin_principals
 )
+from utils.executor import ExecutorSaturatedError
 from utils.database import (
     get_admin_collection, get_portfolio_collection,
     get_projects_collection, get_clients_collection,
     get_messages_collection
 )
 from utils.config import get_config
+from services.portfolio import refresh_portfolio_snapshot, get_content_version
+from utils.http import make_etag, conditional_response
+from utils.pagination import keyset_query, build_page
+from services.media_gc import gc_orphan_media
+from services.message_stats import (
+    get_message_counts, count_for_filter, record_message_update
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -30,6 +41,14 @@ async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(
     """Verifica se o usuário está autenticado"""
     try:
         token = credentials.credentials
+        
+        # Token já verificado recentemente: sem decode nem consulta ao banco
+        cached = principal_cache.get(token)
+        if cached is not None:
+            return cached
+        
+        cache_version = principal_cache.version
+        
         payload = verify_token(token)
         username = payload.get("sub")
         
@@ -42,7 +61,13 @@ async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(
                 detail="Usuário não encontrado"
             )
         
-        return AdminUser(**admin)
+        admin_user = AdminUser(**admin)
+        
+        # Nunca manter em cache além da expiração do token
+        expires_in = payload["exp"] - time.time() if "exp" in payload else None
+        principal_cache.set(token, admin_user, version=cache_version, ttl_seconds=expires_in)
+        
+        return admin_user
         
     except Exception as e:
         logger.error(f"Erro na autenticação: {str(e)}")
@@ -59,18 +84,29 @@ async def admin_login(login_data: AdminLogin):
         admin_col = await get_admin_collection()
         admin = await admin_col.find_one({"username": login_data.username})
         
-        if not admin or not verify_password(login_data.password, admin["passwordHash"]):
+        if not admin or not await verify_password_async(login_data.password, admin["passwordHash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Credenciais inválidas"
             )
         
         # Atualizar último login
+        login_update = {"lastLogin": datetime.utcnow()}
+        
+        # Refazer hash se o custo configurado mudou
+        if password_needs_rehash(admin["passwordHash"]):
+            login_update["passwordHash"] = await hash_password_async(login_data.password)
+        
         await admin_col.update_one(
             {"_id": admin["_id"]},
-            {"$set": {"lastLogin": datetime.utcnow()}}
+            {"$set": login_update}
         )
         
+        # Só lastLogin mudou: os administradores em cache continuam válidos
+        # (lastLogin pode ficar defasado até PRINCIPAL_CACHE_TTL)
+        if "passwordHash" in login_update:
+            invalidate_admin_principals()
+        
         # Criar token
         access_token = create_access_token(data={"sub": admin["username"]})
         
@@ -82,6 +118,12 @@ async def admin_login(login_data: AdminLogin):
         
     except HTTPException:
         raise
+    except ExecutorSaturatedError:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Erro no login: {str(e)}")
         raise HTTPException(
@@ -138,6 +180,8 @@ async def update_portfolio(
                 detail="Erro ao atualizar portfólio"
             )
         
+        await refresh_portfolio_snapshot()
+        
         return {"success": True, "message": "Portfólio atualizado com sucesso"}
         
     except Exception as e:
@@ -146,9 +190,23 @@ async def update_portfolio(
 
 
 @router.get("/projects")
-async def get_admin_projects(current_admin: AdminUser = Depends(get_current_admin)):
+async def get_admin_projects(
+    request: Request,
+    response: Response,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
     """Lista todos os projetos para admin"""
     try:
+        content = await get_content_version()
+        not_modified = conditional_response(
+            request, response,
+            make_etag("admin-projects", content["version"], content["updatedAt"]),
+            content["updatedAt"],
+            cache_control="private, no-cache"
+        )
+        if not_modified:
+            return not_modified
+        
         projects_col = await get_projects_collection()
         projects = await projects_col.find().sort("createdAt", -1).to_list(100)
         
@@ -177,6 +235,8 @@ async def create_project(
                 detail="Erro ao criar projeto"
             )
         
+        await refresh_portfolio_snapshot()
+        
         return {"success": True, "message": "Projeto criado com sucesso", "id": new_project.id}
         
     except Exception as e:
@@ -208,6 +268,8 @@ async def update_project(
                 detail="Projeto não encontrado"
             )
         
+        await refresh_portfolio_snapshot()
+        
         return {"success": True, "message": "Projeto atualizado com sucesso"}
         
     except Exception as e:
@@ -232,6 +294,8 @@ async def delete_project(
                 detail="Projeto não encontrado"
             )
         
+        await refresh_portfolio_snapshot()
+        
         return {"success": True, "message": "Projeto removido com sucesso"}
         
     except Exception as e:
@@ -240,9 +304,23 @@ async def delete_project(
 
 
 @router.get("/clients")
-async def get_admin_clients(current_admin: AdminUser = Depends(get_current_admin)):
+async def get_admin_clients(
+    request: Request,
+    response: Response,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
     """Lista todos os clientes para admin"""
     try:
+        content = await get_content_version()
+        not_modified = conditional_response(
+            request, response,
+            make_etag("admin-clients", content["version"], content["updatedAt"]),
+            content["updatedAt"],
+            cache_control="private, no-cache"
+        )
+        if not_modified:
+            return not_modified
+        
         clients_col = await get_clients_collection()
         clients = await clients_col.find().sort("order", 1).to_list(100)
         
@@ -271,6 +349,8 @@ async def create_client(
                 detail="Erro ao criar cliente"
             )
         
+        await refresh_portfolio_snapshot()
+        
         return {"success": True, "message": "Cliente criado com sucesso", "id": new_client.id}
         
     except Exception as e:
@@ -302,6 +382,8 @@ async def update_client(
                 detail="Cliente não encontrado"
             )
         
+        await refresh_portfolio_snapshot()
+        
         return {"success": True, "message": "Cliente atualizado com sucesso"}
         
     except Exception as e:
@@ -326,6 +408,8 @@ async def delete_client(
                 detail="Cliente não encontrado"
             )
         
+        await refresh_portfolio_snapshot()
+        
         return {"success": True, "message": "Cliente removido com sucesso"}
         
     except Exception as e:
@@ -333,40 +417,85 @@ async def delete_client(
         raise HTTPException(status_code=500, detail="Erro interno")
 
 
+@router.get("/media/orphans")
+async def get_orphan_media_report(
+    grace_seconds: Optional[float] = None,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Relatório (simulação) de arquivos no armazenamento sem referência no conteúdo"""
+    try:
+        return await gc_orphan_media(dry_run=True, grace_seconds=grace_seconds)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao gerar relatório de mídia órfã: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno")
+
+
+@router.post("/media/orphans/gc")
+async def collect_orphan_media(
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Remove os arquivos órfãos mais antigos que o período de carência"""
+    try:
+        report = await gc_orphan_media(dry_run=False)
+        
+        logger.info(f"GC de mídia executado por {current_admin.username}: {report['deleted']} removidos")
+        
+        return report
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na coleta de mídia órfã: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno")
+
+
 @router.get("/messages")
 async def get_messages(
-    page: int = 1,
+    cursor: Optional[str] = None,
     limit: int = 20,
     read: Optional[bool] = None,
     current_admin: AdminUser = Depends(get_current_admin)
 ):
-    """Lista mensagens de contato"""
+    """Lista mensagens de contato (paginação por cursor em createdAt, id)"""
     try:
         messages_col = await get_messages_collection()
         
+        limit = max(1, min(limit, 100))
+        
         # Filtros
         filter_query = {}
         if read is not None:
             filter_query["read"] = read
         
-        # Paginação
-        skip = (page - 1) * limit
+        # Paginação por cursor: custo constante em qualquer profundidade
+        query, sort, direction = keyset_query(filter_query, cursor)
         
-        messages = await messages_col.find(filter_query)\
-            .sort("createdAt", -1)\
-            .skip(skip)\
-            .limit(limit)\
-            .to_list(limit)
+        messages = await messages_col.find(query)\
+            .sort(sort)\
+            .limit(limit + 1)\
+            .to_list(limit + 1)
         
-        total = await messages_col.count_documents(filter_query)
+        messages, next_cursor, prev_cursor = build_page(
+            messages, limit, direction, has_cursor=bool(cursor)
+        )
+        
+        # Contadores mantidos incrementalmente (sem count_documents)
+        counts = await get_message_counts()
         
         return {
             "messages": [ContactMessage(**msg) for msg in messages],
-            "total": total,
-            "page": page,
-            "pages": (total + limit - 1) // limit
+            "total": count_for_filter(counts, read),
+            "counts": counts,
+            "limit": limit,
+            "next": next_cursor,
+            "prev": prev_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar mensagens: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro interno")
@@ -384,19 +513,25 @@ async def update_message(
         
         update_data = {k: v for k, v in message_update.dict().items() if v is not None}
         
-        result = await messages_col.update_one(
+        # Estado anterior para ajustar os contadores
+        before = await messages_col.find_one_and_update(
             {"id": message_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"read": 1, "replied": 1}
         )
         
-        if result.modified_count == 0:
+        if before is None:
             raise HTTPException(
                 status_code=404,
                 detail="Mensagem não encontrada"
             )
         
+        await record_message_update(before, update_data)
+        
         return {"success": True, "message": "Mensagem atualizada com sucesso"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao atualizar mensagem: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro interno")
@@ -420,6 +555,7 @@ async def create_default_admin():
             )
             
             await admin_col.insert_one(default_admin.dict())
+            invalidate_admin_principals()
             logger.info("Admin padrão criado: username=admin, password=admin123")
         
     except Exception as e:
@@ -0,0 +1,133 @@
+import os
+import re
+import logging
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from services.storage import UPLOAD_ROOT
+from utils.http import make_etag, is_not_modified, select_encoding
+from utils.static import (
+    RangedFileResponse, RangeNotSatisfiable, SIDECAR_EXTENSIONS,
+    parse_range, stat_regular_file
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# Nomes derivados do SHA-256 do conteúdo (originais e versões responsivas)
+# nunca mudam de conteúdo: cache de longo prazo sem revalidação
+CONTENT_HASHED_NAME = re.compile(r"^[0-9a-f]{64}(-\d+w)?(\.[a-z0-9]+)?$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_CACHE_CONTROL = os.environ.get("MEDIA_CACHE_CONTROL", "public, max-age=300")
+
+# Content-Type apenas para imagens e vídeos conhecidos; qualquer outra
+# extensão é servida como download opaco (nunca como HTML/SVG/script)
+MEDIA_CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".mp4": "video/mp4",
+    ".avi": "video/x-msvideo",
+    ".mov": "video/quicktime",
+    ".wmv": "video/x-ms-wmv",
+    ".flv": "video/x-flv",
+}
+DEFAULT_MEDIA_TYPE = "application/octet-stream"
+
+# Prefixo interno do nginx para X-Accel-Redirect (sendfile no proxy);
+# vazio para a aplicação enviar o arquivo
+MEDIA_ACCEL_REDIRECT = os.environ.get("MEDIA_ACCEL_REDIRECT", "").rstrip("/")
+
+
+def resolve_media_path(path: str) -> str:
+    """Caminho em disco dentro de UPLOAD_ROOT; arquivos ocultos e temporários ficam de fora"""
+    parts = [p for p in path.split("/") if p]
+    if not parts or any(p in ("..", ".") or p.startswith(".") or p.endswith(".part") for p in parts):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    return os.path.join(UPLOAD_ROOT, *parts)
+
+
+def stat_representations(file_path: str):
+    """stat do arquivo e dos sidecars pré-comprimidos existentes (uma ida ao threadpool)"""
+    stat_result = stat_regular_file(file_path)
+    if stat_result is None:
+        return None
+    representations = {"identity": (file_path, stat_result)}
+    for encoding, extension in SIDECAR_EXTENSIONS.items():
+        sidecar_stat = stat_regular_file(file_path + extension)
+        if sidecar_stat is not None:
+            representations[encoding] = (file_path + extension, sidecar_stat)
+    return representations
+
+
+@router.api_route("/uploads/{path:path}", methods=["GET", "HEAD"])
+async def serve_media(path: str, request: Request):
+    """Serve arquivos enviados com Range/206, ETag forte e cache por nome"""
+    file_path = resolve_media_path(path)
+    representations = await run_in_threadpool(stat_representations, file_path)
+    if representations is None:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    filename = os.path.basename(file_path)
+    media_type = MEDIA_CONTENT_TYPES.get(os.path.splitext(filename)[1].lower(), DEFAULT_MEDIA_TYPE)
+    content_hashed = CONTENT_HASHED_NAME.match(filename) is not None
+
+    # nosniff em todas as respostas: o navegador não reinterpreta o conteúdo
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if content_hashed else MEDIA_CACHE_CONTROL,
+        "X-Content-Type-Options": "nosniff"
+    }
+    if media_type == DEFAULT_MEDIA_TYPE:
+        headers["Content-Disposition"] = "attachment"
+    range_header = request.headers.get("range")
+
+    # Versão pré-comprimida (ex.: SVG/JSON) apenas para respostas completas
+    encoding = "identity"
+    if len(representations) > 1:
+        headers["Vary"] = "Accept-Encoding"
+        if not range_header:
+            encoding = select_encoding(request.headers.get("accept-encoding"), representations)
+
+    file_path, stat_result = representations[encoding]
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    # ETag forte por representação: o nome já identifica o conteúdo nos
+    # arquivos endereçados por hash; nos demais, tamanho/mtime/inode
+    if content_hashed:
+        etag = make_etag(filename, encoding)
+    else:
+        etag = make_etag(filename, encoding, stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+    headers["ETag"] = etag
+
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if MEDIA_ACCEL_REDIRECT:
+        # O nginx faz o envio (incluindo Range) direto do disco
+        accel_path = f"{MEDIA_ACCEL_REDIRECT}/{os.path.relpath(file_path, UPLOAD_ROOT)}"
+        return RangedFileResponse(file_path, stat_result, headers=headers, media_type=media_type, accel_path=accel_path)
+
+    # If-Range: só atender o Range se a versão do cliente ainda é a atual
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        content_range = parse_range(range_header, stat_result.st_size)
+    except RangeNotSatisfiable:
+        headers["Content-Range"] = f"bytes */{stat_result.st_size}"
+        return Response(status_code=416, headers=headers)
+
+    return RangedFileResponse(
+        file_path,
+        stat_result,
+        status_code=206 if content_range else 200,
+        headers=headers,
+        media_type=media_type,
+        content_range=content_range
+    )
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Header, Request, Response, status
+from typing import List, Dict, Any, Optional
+import time
 import logging
 
 from models.portfolio import Portfolio
 from models.project import Project
 from models.client import Client
 from models.message import ContactMessage, ContactMessageCreate
-from utils.database import (
-    get_portfolio_collection, 
-    get_projects_collection, 
-    get_clients_collection,
-    get_messages_collection
+from utils.database import get_messages_collection
+from services.outbox import enqueue_message_emails
+from services.cache import portfolio_cache, PORTFOLIO_CACHE_KEY, PORTFOLIO_CACHE_CHECK_INTERVAL
+from services.portfolio import get_portfolio_snapshot, get_snapshot_marker
+from services.message_stats import record_new_message
+from services.idempotency import (
+    claim_key, complete_key, release_key, contact_content_hash,
+    IDEMPOTENCY_KEY_TTL, CONTACT_DEDUPE_WINDOW, IDEMPOTENCY_KEY_MAX_LENGTH, COMPLETED
 )
-from services.email import send_contact_email, send_admin_notification
+from utils.http import EncodedPayload
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -25,48 +29,56 @@ async def api_status():
 
 
 @router.get("/portfolio")
-async def get_portfolio_data():
+async def get_portfolio_data(request: Request):
     """
     Retorna dados completos do portfólio para o frontend
     """
     try:
-        # Collections
-        portfolio_col = await get_portfolio_collection()
-        projects_col = await get_projects_collection()
-        clients_col = await get_clients_collection()
-        
-        # Buscar dados do portfólio
-        portfolio_data = await portfolio_col.find_one()
-        if not portfolio_data:
-            # Retornar dados padrão se não existir
-            portfolio_data = await create_default_portfolio()
-        
-        # Buscar projetos em destaque
-        featured_projects = await projects_col.find(
-            {"featured": True}
-        ).sort("createdAt", -1).to_list(10)
-        
-        # Buscar projetos recentes
-        recent_projects = await projects_col.find(
-            {"featured": False}
-        ).sort("createdAt", -1).to_list(10)
-        
-        # Buscar clientes ativos
-        clients = await clients_col.find(
-            {"active": True}
-        ).sort("order", 1).to_list(20)
+        # Servir do cache em memória quando possível; a invalidação é local
+        # ao processo, então a cada PORTFOLIO_CACHE_CHECK_INTERVAL a entrada
+        # é conferida com a versão do snapshot (escritas do admin feitas em
+        # outro worker também a alteram)
+        cached = portfolio_cache.get(PORTFOLIO_CACHE_KEY)
+        
+        if cached is not None:
+            now = time.monotonic()
+            if now - cached["checkedAt"] < PORTFOLIO_CACHE_CHECK_INTERVAL:
+                return cached["encoded"].to_response(request)
+            
+            # Uma conferência por intervalo; requisições simultâneas seguem com o cache
+            cached["checkedAt"] = now
+            try:
+                marker = await get_snapshot_marker()
+            except Exception as e:
+                logger.warning(f"Versão do snapshot indisponível, servindo portfólio do cache: {str(e)}")
+                marker = cached["marker"]
+            
+            if marker == cached["marker"]:
+                return cached["encoded"].to_response(request)
+        
+        cache_version = portfolio_cache.version
+        
+        # Snapshot pré-montado: uma única leitura por _id
+        snapshot = await get_portfolio_snapshot()
+        
+        # Serializar e comprimir uma vez por versão de conteúdo
+        encoded = EncodedPayload(
+            snapshot["payload"],
+            version_parts=("portfolio", snapshot["version"], snapshot["updatedAt"]),
+            last_modified=snapshot["updatedAt"]
+        )
         
-        # Formatar resposta
-        response = {
-            "personal": portfolio_data.get("personal", {}),
-            "demoReel": portfolio_data.get("demoReel", {}),
-            "services": portfolio_data.get("services", []),
-            "featuredWorks": [format_project(p) for p in featured_projects],
-            "recentProjects": [format_project(p) for p in recent_projects],
-            "clients": [format_client(c) for c in clients]
-        }
+        portfolio_cache.set(
+            PORTFOLIO_CACHE_KEY,
+            {
+                "marker": (snapshot.get("version", 0), snapshot.get("updatedAt")),
+                "encoded": encoded,
+                "checkedAt": time.monotonic()
+            },
+            version=cache_version
+        )
         
-        return response
+        return encoded.to_response(request)
         
     except Exception as e:
         logger.error(f"Erro ao buscar portfólio: {str(e)}")
@@ -77,131 +89,103 @@ async def get_portfolio_data():
 
 
 @router.post("/contact")
-async def send_contact_message(message: ContactMessageCreate):
+async def send_contact_message(
+    message: ContactMessageCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
-    Recebe e processa mensagem de contato
+    Recebe e processa mensagem de contato.
+    
+    Com o header Idempotency-Key, reenvios retornam a resposta original sem
+    gravar nada. Sem o header, mensagens com o mesmo conteúdo (email,
+    assunto, mensagem) são rejeitadas dentro de CONTACT_DEDUPE_WINDOW.
     """
+    content_hash = contact_content_hash(message.email, message.subject, message.message)
+    
+    if idempotency_key:
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key inválida")
+        claim = f"contact:key:{idempotency_key}"
+        ttl = IDEMPOTENCY_KEY_TTL
+    else:
+        claim = f"contact:content:{content_hash}"
+        ttl = CONTACT_DEDUPE_WINDOW
+    
     try:
-        # Criar objeto de mensagem
-        contact_message = ContactMessage(**message.dict())
-        
-        # Salvar no banco
-        messages_col = await get_messages_collection()
-        result = await messages_col.insert_one(contact_message.dict())
-        
-        if not result.inserted_id:
+        claim_id, existing = await claim_key(claim, content_hash, ttl)
+    except Exception as e:
+        logger.error(f"Erro ao verificar idempotência: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erro ao enviar mensagem. Tente novamente."
+        )
+    
+    if existing is not None:
+        if not idempotency_key:
+            raise HTTPException(status_code=409, detail="Mensagem duplicada")
+        if existing.get("requestHash") != content_hash:
             raise HTTPException(
-                status_code=500,
-                detail="Erro ao salvar mensagem"
+                status_code=422,
+                detail="Idempotency-Key já utilizada com outro conteúdo"
             )
+        if existing.get("status") != COMPLETED:
+            raise HTTPException(status_code=409, detail="Requisição em processamento")
         
-        # Enviar email
-        email_sent = await send_contact_email(contact_message)
-        
-        # Enviar notificação para admin (opcional)
-        await send_admin_notification(contact_message)
-        
-        logger.info(f"Mensagem de contato recebida de {message.email}")
+        response.headers["Idempotent-Replayed"] = "true"
+        return existing["response"]
+    
+    try:
+        # Id da mensagem = id da reserva: uma tentativa que retoma a reserva
+        # de outra interrompida reaproveita a mensagem já gravada
+        contact_message = ContactMessage(id=claim_id, **message.dict())
         
-        return {
-            "success": True,
-            "message": "Mensagem enviada com sucesso! Entrarei em contato em breve.",
-            "email_sent": email_sent
-        }
+        # Salvar no banco
+        messages_col = await get_messages_collection()
+        result = await messages_col.update_one(
+            {"id": contact_message.id},
+            {"$setOnInsert": contact_message.dict()},
+            upsert=True
+        )
+        created = result.upserted_id is not None
         
     except Exception as e:
         logger.error(f"Erro ao processar contato: {str(e)}")
+        await release_key(claim, claim_id)
         raise HTTPException(
             status_code=500,
             detail="Erro ao enviar mensagem. Tente novamente."
         )
-
-
-# Funções auxiliares
-def format_project(project: dict) -> dict:
-    """Formata projeto para resposta da API"""
-    return {
-        "id": project.get("id"),
-        "title": project.get("title"),
-        "client": project.get("client"),
-        "year": project.get("year"),
-        "category": project.get("category"),
-        "description": project.get("description"),
-        "image": project.get("image", ""),
-        "featured": project.get("featured", False),
-        "videoUrl": project.get("videoUrl", ""),
-        "date": project.get("date")
-    }
-
-
-def format_client(client: dict) -> dict:
-    """Formata cliente para resposta da API"""
-    return {
-        "id": client.get("id"),
-        "name": client.get("name"),
-        "logo": client.get("logo", ""),
-        "website": client.get("website", "")
+    
+    # Mensagem gravada: a partir daqui a requisição é um sucesso e a chave
+    # nunca é liberada (uma nova tentativa duplicaria a mensagem)
+    if created:
+        try:
+            await record_new_message()
+        except Exception as e:
+            logger.error(f"Erro ao atualizar contadores de mensagens: {str(e)}")
+    
+    # Enfileirar emails (contato + notificação do admin); a entrega
+    # acontece em segundo plano pelo worker da fila, que também enfileira
+    # mensagens gravadas com `emailsQueued` falso se esta etapa falhar
+    try:
+        await enqueue_message_emails(contact_message.id)
+    except Exception as e:
+        logger.warning(f"Emails da mensagem {contact_message.id} serão enfileirados pelo worker: {str(e)}")
+    
+    logger.info(f"Mensagem de contato recebida de {message.email}")
+    
+    result = {
+        "success": True,
+        "message": "Mensagem enviada com sucesso! Entrarei em contato em breve.",
+        "email_queued": True
     }
-
-
-async def create_default_portfolio():
-    """Cria portfólio padrão se não existir"""
+    
     try:
-        portfolio_col = await get_portfolio_collection()
-        
-        default_portfolio = {
-            "personal": {
-                "name": "Jeferson Rodrigues",
-                "role": "Gaffer | Iluminação Audiovisual",
-                "location": "São Paulo & Rio de Janeiro",
-                "email": "jeferson@exemplo.com",
-                "phone": "+55 11 9999-9999",
-                "bio": "Profissional especializado em iluminação para produções audiovisuais com mais de 8 anos de experiência. Trabalho como Gaffer em grandes produções para Netflix, canais de TV e campanhas publicitárias.",
-                "heroImage": "",
-                "aboutImage": "",
-                "social": {
-                    "instagram": "@jefersonrodrigues",
-                    "linkedin": "jeferson-rodrigues",
-                    "youtube": "@jefersonrodrigues",
-                    "whatsapp": "5511999999999"
-                }
-            },
-            "demoReel": {
-                "title": "Demo Reel 2024",
-                "description": "Principais trabalhos em iluminação cinematográfica",
-                "videoUrl": "",
-                "thumbnail": ""
-            },
-            "services": [
-                {
-                    "title": "Gaffer",
-                    "description": "Direção de iluminação para cinema, TV e publicidade",
-                    "icon": "lightbulb"
-                },
-                {
-                    "title": "Direção de Fotografia",
-                    "description": "Conceito visual e estética cinematográfica",
-                    "icon": "camera"
-                },
-                {
-                    "title": "Consultoria Técnica",
-                    "description": "Planejamento de equipamentos e orçamentos",
-                    "icon": "settings"
-                },
-                {
-                    "title": "Color Grading",
-                    "description": "Finalização e correção de cor",
-                    "icon": "palette"
-                }
-            ]
-        }
-        
-        # Inserir no banco
-        await portfolio_col.insert_one(default_portfolio)
-        logger.info("Portfólio padrão criado")
-        
-        return default_portfolio
-        
+        await complete_key(claim, result)
     except Exception as e:
-        logger.error(f"Erro ao criar portfólio padrão: {str(e)}")
-        return {}
\ No newline at end of file
+        # A reserva pendente vence pelo lease; a nova tentativa a retoma
+        # e reaproveita a mensagem gravada
+        logger.error(f"Erro ao registrar chave de idempotência: {str(e)}")
+    
+    return result
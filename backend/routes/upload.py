@@ -1,21 +1,47 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Request, Response, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import json
+import asyncio
 import logging
 
-from services.upload import upload_image, upload_video, get_upload_config, delete_file
+from services.upload import (
+    upload_image, upload_video, get_upload_config, delete_file,
+    UPLOAD_CONCURRENCY, UPLOAD_FILE_TIMEOUT
+)
+from services.upload_sessions import (
+    create_session, get_session, write_chunk, complete_session, abort_session, session_status
+)
+from services.direct_upload import create_direct_upload, complete_direct_upload
 from routes.admin import get_current_admin
 from models.admin import AdminUser
+from models.upload import UploadSessionCreate, DirectUploadCreate
+from utils.http import make_etag, conditional_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 security = HTTPBearer()
 
 
+def format_variants(media: Dict[str, Any]) -> list:
+    """Versões responsivas da mídia para a resposta do upload"""
+    return [
+        {k: v.get(k) for k in ("url", "width", "height", "format", "size")}
+        for v in media.get("variants", [])
+    ]
+
+
 @router.get("/config")
-async def upload_config():
+async def upload_config(request: Request, response: Response):
     """Retorna configuração de upload"""
-    return get_upload_config()
+    config = get_upload_config()
+    
+    etag = make_etag("upload-config", json.dumps(config, sort_keys=True))
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    return config
 
 
 @router.post("/image")
@@ -30,14 +56,15 @@ async def upload_image_endpoint(
             raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
         
         # Upload da imagem
-        image_url = await upload_image(file, folder)
+        media = await upload_image(file, folder)
         
-        logger.info(f"Imagem uploaded por {current_admin.username}: {image_url}")
+        logger.info(f"Imagem uploaded por {current_admin.username}: {media['url']}")
         
         return {
             "success": True,
             "message": "Imagem enviada com sucesso",
-            "url": image_url,
+            "url": media["url"],
+            "variants": format_variants(media),
             "filename": file.filename
         }
         
@@ -60,14 +87,14 @@ async def upload_video_endpoint(
             raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
         
         # Upload do vídeo
-        video_url = await upload_video(file, folder)
+        media = await upload_video(file, folder)
         
-        logger.info(f"Vídeo uploaded por {current_admin.username}: {video_url}")
+        logger.info(f"Vídeo uploaded por {current_admin.username}: {media['url']}")
         
         return {
             "success": True,
             "message": "Vídeo enviado com sucesso",
-            "url": video_url,
+            "url": media["url"],
             "filename": file.filename
         }
         
@@ -118,35 +145,48 @@ async def upload_multiple_files(
         if len(files) > 10:
             raise HTTPException(status_code=400, detail="Máximo 10 arquivos por vez")
         
-        results = []
-        
-        for file in files:
-            try:
-                # Determinar tipo de upload baseado no content_type
-                if file.content_type.startswith("image/"):
-                    url = await upload_image(file, folder)
-                elif file.content_type.startswith("video/"):
-                    url = await upload_video(file, f"{folder}/videos")
-                else:
-                    results.append({
+        # Arquivos processados em paralelo (limitado por UPLOAD_CONCURRENCY);
+        # falhas ficam isoladas por arquivo e a ordem original é mantida
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        
+        async def process_file(file: UploadFile) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    # Determinar tipo de upload baseado no content_type
+                    if file.content_type.startswith("image/"):
+                        upload = upload_image(file, folder)
+                    elif file.content_type.startswith("video/"):
+                        upload = upload_video(file, f"{folder}/videos")
+                    else:
+                        return {
+                            "filename": file.filename,
+                            "success": False,
+                            "error": "Tipo de arquivo não suportado"
+                        }
+                    
+                    media = await asyncio.wait_for(upload, timeout=UPLOAD_FILE_TIMEOUT)
+                    
+                    return {
+                        "filename": file.filename,
+                        "success": True,
+                        "url": media["url"],
+                        "variants": format_variants(media)
+                    }
+                    
+                except asyncio.TimeoutError:
+                    return {
+                        "filename": file.filename,
+                        "success": False,
+                        "error": "Tempo limite excedido"
+                    }
+                except Exception as e:
+                    return {
                         "filename": file.filename,
                         "success": False,
-                        "error": "Tipo de arquivo não suportado"
-                    })
-                    continue
-                
-                results.append({
-                    "filename": file.filename,
-                    "success": True,
-                    "url": url
-                })
-                
-            except Exception as e:
-                results.append({
-                    "filename": file.filename,
-                    "success": False,
-                    "error": str(e)
-                })
+                        "error": str(e)
+                    }
+        
+        results = await asyncio.gather(*(process_file(file) for file in files))
         
         success_count = sum(1 for r in results if r["success"])
         
@@ -162,4 +202,113 @@ async def upload_multiple_files(
         raise
     except Exception as e:
         logger.error(f"Erro no upload múltiplo: {str(e)}")
-        raise HTTPException(status_code=500, detail="Erro no upload múltiplo")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Erro no upload múltiplo")
+
+
+# Upload retomável: sessão criada, blocos enviados em qualquer ordem
+# (inclusive em paralelo), consulta do progresso e finalização
+@router.post("/sessions")
+async def create_upload_session(
+    data: UploadSessionCreate,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Cria sessão de upload retomável"""
+    try:
+        session = await create_session(data)
+        return session_status(session)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao criar sessão de upload: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao criar sessão de upload")
+
+
+@router.get("/sessions/{session_id}")
+async def get_upload_session(
+    session_id: str,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Estado da sessão (blocos recebidos, pendentes e offset contíguo)"""
+    return session_status(await get_session(session_id))
+
+
+@router.put("/sessions/{session_id}/chunks/{index}")
+async def upload_session_chunk(
+    session_id: str,
+    index: int,
+    request: Request,
+    chunk_sha256: Optional[str] = Header(None, alias="X-Chunk-SHA256"),
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Recebe um bloco (corpo bruto); X-Chunk-SHA256 opcional para verificação"""
+    try:
+        return await write_chunk(session_id, index, request.stream(), chunk_sha256)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao gravar bloco {index} da sessão {session_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao gravar bloco")
+
+
+@router.post("/sessions/{session_id}/complete")
+async def complete_upload_session(
+    session_id: str,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Finaliza a sessão e armazena o arquivo"""
+    session = await complete_session(session_id)
+    
+    logger.info(f"Upload retomável concluído por {current_admin.username}: {session['url']}")
+    
+    return {
+        "success": True,
+        "message": "Arquivo enviado com sucesso",
+        "url": session["url"],
+        "variants": format_variants(session),
+        "filename": session["filename"]
+    }
+
+
+@router.delete("/sessions/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Cancela a sessão e descarta os blocos recebidos"""
+    if not await abort_session(session_id):
+        raise HTTPException(status_code=404, detail="Sessão de upload não encontrada")
+    
+    return {"success": True, "message": "Sessão de upload cancelada"}
+
+
+@router.post("/direct")
+async def create_direct_upload_endpoint(
+    data: DirectUploadCreate,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """
+    Autoriza envio direto ao armazenamento (URL ou formulário assinado).
+    O cliente envia o arquivo ao `url` retornado e chama /direct/{id}/complete.
+    """
+    return await create_direct_upload(data)
+
+
+@router.post("/direct/{upload_id}/complete")
+async def complete_direct_upload_endpoint(
+    upload_id: str,
+    current_admin: AdminUser = Depends(get_current_admin)
+):
+    """Confere o arquivo enviado direto ao armazenamento e o registra"""
+    upload = await complete_direct_upload(upload_id)
+    
+    logger.info(f"Upload direto concluído por {current_admin.username}: {upload['url']}")
+    
+    return {
+        "success": True,
+        "message": "Arquivo enviado com sucesso",
+        "url": upload["url"],
+        "variants": format_variants(upload),
+        "filename": upload["filename"]
+    }
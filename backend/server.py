@@ -9,11 +9,23 @@ from pathlib import Path
 from routes.public import router as public_router
 from routes.admin import router as admin_router
 from routes.upload import router as upload_router
+from routes.media import router as media_router
 
 # Importar utilitários
 from utils.database import connect_to_mongo, close_mongo_connection
 from utils.config import validate_config
-from services.email import validate_email_config
+from services.email import validate_email_config, emailjs_breaker
+from services.cache import portfolio_cache
+from services.message_stats import reconcile_message_stats, MESSAGE_STATS_RECONCILE_INTERVAL
+from services.outbox import outbox_worker
+from services.http_client import http_client
+from utils.tasks import start_periodic_task, stop_background_tasks
+from utils.rate_limit import RateLimitMiddleware
+from services.auth import password_executor
+from services.storage import storage_stats, shutdown_storage
+from services.images import image_stats, shutdown_image_executor
+from services.upload_sessions import gc_upload_sessions, UPLOAD_SESSION_GC_INTERVAL
+from services.media_gc import gc_orphan_media, MEDIA_GC_INTERVAL
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -44,10 +56,40 @@ async def lifespan(app: FastAPI):
     from routes.admin import create_default_admin
     await create_default_admin()
     
+    # Recompor snapshot público (formato pode ter mudado entre versões)
+    from services.portfolio import refresh_portfolio_snapshot
+    await refresh_portfolio_snapshot()
+    
+    # Cliente HTTP compartilhado para chamadas externas
+    await http_client.start()
+    
+    # Tarefas em segundo plano
+    outbox_worker.start()
+    start_periodic_task(
+        "reconcile_message_stats",
+        MESSAGE_STATS_RECONCILE_INTERVAL,
+        reconcile_message_stats,
+        run_immediately=True
+    )
+    start_periodic_task(
+        "gc_upload_sessions",
+        UPLOAD_SESSION_GC_INTERVAL,
+        gc_upload_sessions,
+        run_immediately=True
+    )
+    if MEDIA_GC_INTERVAL > 0:
+        start_periodic_task("gc_orphan_media", MEDIA_GC_INTERVAL, gc_orphan_media)
+    
     yield
     
     # Shutdown
     logger.info("Encerrando aplicação")
+    await outbox_worker.stop()
+    await stop_background_tasks()
+    await http_client.close()
+    password_executor.shutdown()
+    shutdown_storage()
+    shutdown_image_executor()
     await close_mongo_connection()
 
 # Create the main app
@@ -69,6 +111,13 @@ api_router.include_router(upload_router, prefix="/upload", tags=["Upload"])
 # Include the router in the main app
 app.include_router(api_router)
 
+# Arquivos enviados (armazenamento local), servidos em /uploads
+app.include_router(media_router, tags=["Media"])
+
+# Rate limiting para rotas sensíveis (contato e login); registrado antes
+# do CORS para que as respostas 429 também recebam os headers CORS
+app.add_middleware(RateLimitMiddleware)
+
 # Middleware CORS
 app.add_middleware(
     CORSMiddleware,
@@ -97,5 +146,11 @@ async def health_check():
         "status": "healthy",
         "database": config_status["mongodb"],
         "email_configured": email_status["configured"],
-        "cloudinary": config_status["cloudinary"]
+        "cloudinary": config_status["cloudinary"],
+        "portfolio_cache": portfolio_cache.stats(),
+        "email_outbox": outbox_worker.stats(),
+        "email_circuit": emailjs_breaker.stats(),
+        "password_hashing": password_executor.stats(),
+        "storage": storage_stats(),
+        "image_variants": image_stats()
     }
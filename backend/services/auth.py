@@ -5,15 +5,38 @@ from typing import Optional
 import os
 from fastapi import HTTPException, status
 from models.admin import AdminUser, AdminResponse
+from utils.executor import BoundedExecutor
+from services.cache import TTLCache
 
 # Configuração JWT
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "gaffer-portfolio-secret-key-2024")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 horas
 
+# Configuração bcrypt: custo e pool dedicado (fora do event loop)
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+BCRYPT_MAX_WORKERS = int(os.environ.get("BCRYPT_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_QUEUE = int(os.environ.get("BCRYPT_MAX_QUEUE", "16"))
+
+password_executor = BoundedExecutor("bcrypt", BCRYPT_MAX_WORKERS, BCRYPT_MAX_QUEUE)
+
+# Cache de administradores autenticados, por token (limitado também pela
+# expiração do token). Invalidado quando um registro de admin muda.
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "60"))  # segundos
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.environ.get("PRINCIPAL_CACHE_MAX_ENTRIES", "256"))
+
+principal_cache = TTLCache(
+    ttl_seconds=PRINCIPAL_CACHE_TTL,
+    max_entries=PRINCIPAL_CACHE_MAX_ENTRIES
+)
+
+def invalidate_admin_principals() -> None:
+    """Descarta administradores em cache após alteração em admin_users"""
+    principal_cache.invalidate()
+
 def hash_password(password: str) -> str:
     """Hash da senha usando bcrypt"""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
@@ -21,6 +44,22 @@ def verify_password(password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+async def hash_password_async(password: str) -> str:
+    """hash_password executado no pool do bcrypt"""
+    return await password_executor.run(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """verify_password executado no pool do bcrypt"""
+    return await password_executor.run(verify_password, password, hashed_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Indica se o hash foi gerado com custo diferente de BCRYPT_ROUNDS"""
+    try:
+        # Formato: $2b$<custo>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Cria token JWT"""
     to_encode = data.copy()
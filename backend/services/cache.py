@@ -0,0 +1,110 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configurações do cache do portfólio público
+PORTFOLIO_CACHE_TTL = float(os.environ.get("PORTFOLIO_CACHE_TTL", "300"))  # segundos
+PORTFOLIO_CACHE_MAX_ENTRIES = int(os.environ.get("PORTFOLIO_CACHE_MAX_ENTRIES", "8"))
+PORTFOLIO_CACHE_KEY = "public"
+# Intervalo entre conferências da versão do snapshot, que detectam escritas
+# feitas em outros workers (a invalidação do cache é local ao processo)
+PORTFOLIO_CACHE_CHECK_INTERVAL = float(os.environ.get("PORTFOLIO_CACHE_CHECK_INTERVAL", "2"))  # segundos
+
+
+class TTLCache:
+    """
+    Cache em memória com TTL, limite de entradas (LRU) e versão.
+
+    A versão é incrementada a cada invalidação; valores montados a partir
+    de uma versão anterior são descartados em `set`, evitando que uma
+    leitura concorrente com uma escrita do admin repopule o cache com
+    dados antigos.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 128):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna valor válido do cache ou None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, version, value = entry
+        if version != self.version or expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        version: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ) -> bool:
+        """
+        Armazena valor no cache. Se `version` for informada e o cache tiver
+        sido invalidado desde então, o valor é descartado. `ttl_seconds`
+        pode apenas reduzir o TTL padrão.
+        """
+        if version is not None and version != self.version:
+            return False
+
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return False
+
+        self._entries[key] = (time.monotonic() + ttl, self.version, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        return True
+
+    def invalidate(self) -> None:
+        """Invalida todas as entradas"""
+        self.version += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do cache"""
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Cache do payload montado de GET /api/portfolio
+portfolio_cache = TTLCache(
+    ttl_seconds=PORTFOLIO_CACHE_TTL,
+    max_entries=PORTFOLIO_CACHE_MAX_ENTRIES
+)
+
+
+def invalidate_portfolio_cache() -> None:
+    """Invalida o cache do portfólio público após alterações do admin"""
+    portfolio_cache.invalidate()
+    logger.info(f"Cache do portfólio invalidado (versão {portfolio_cache.version})")
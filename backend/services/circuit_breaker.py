@@ -0,0 +1,138 @@
+import time
+import logging
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados do circuito
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Chamada rejeitada porque o circuito está aberto"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuito {name} aberto")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com janela deslizante de taxa de falhas.
+
+    - closed: chamadas passam; abre quando a taxa de falhas na janela
+      atinge `failure_rate_threshold` (com pelo menos `minimum_calls`)
+    - open: chamadas falham imediatamente por `open_seconds`
+    - half_open: até `half_open_max_calls` chamadas de teste; sucesso fecha
+      o circuito, falha reabre
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        window_seconds: float = 60.0,
+        minimum_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_seconds = window_seconds
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CLOSED
+        self._calls: deque = deque()  # (timestamp, sucesso)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """Segundos até o circuito aceitar chamadas de teste"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> None:
+        """Reserva uma chamada ou levanta CircuitOpenError"""
+        state = self.state
+        if state == OPEN:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.retry_after())
+        if state == HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._half_open_in_flight += 1
+
+    def record_success(self) -> None:
+        if self._state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            self._transition(CLOSED)
+            return
+        self._record(True)
+
+    def record_failure(self) -> None:
+        if self._state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            self._transition(OPEN)
+            return
+        self._record(False)
+
+        if self._state == CLOSED and len(self._calls) >= self.minimum_calls:
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if failures / len(self._calls) >= self.failure_rate_threshold:
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """
+        Libera a reserva de before_call sem registrar resultado (ex.: chamada
+        cancelada), para que a vaga de teste do half_open não fique presa
+        """
+        if self._state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def _record(self, success: bool) -> None:
+        now = time.monotonic()
+        self._calls.append((now, success))
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning(f"Circuito {self.name}: {self._state} -> {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        if state in (OPEN, CLOSED):
+            self._half_open_in_flight = 0
+        if state == CLOSED:
+            self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado e métricas do circuito"""
+        failures = sum(1 for _, ok in self._calls if not ok)
+        return {
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "window_failures": failures,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "rejected": self.rejected,
+            "times_opened": self.times_opened
+        }
@@ -0,0 +1,246 @@
+import os
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from starlette.concurrency import run_in_threadpool
+
+from models.upload import DirectUpload, DirectUploadCreate
+from utils.database import get_direct_uploads_collection
+from services.media import acquire_media, register_media, read_image_dimensions
+from services.storage import get_storage
+from services.upload import (
+    ALLOWED_IMAGE_TYPES, ALLOWED_VIDEO_TYPES, MAX_FILE_SIZE, UPLOAD_STAGING_DIR,
+    canonical_content_type, content_key, hash_file, safe_folder, sniff_content_type, store_variants
+)
+
+logger = logging.getLogger(__name__)
+
+# Upload direto ao armazenamento (S3): os bytes não passam pela API
+DIRECT_UPLOAD_MAX_SIZE = int(os.environ.get("DIRECT_UPLOAD_MAX_SIZE", str(4 * 1024 * 1024 * 1024)))  # 4GB
+DIRECT_UPLOAD_URL_TTL = int(os.environ.get("DIRECT_UPLOAD_URL_TTL", "900"))  # validade da URL assinada (segundos)
+DIRECT_UPLOAD_TTL = float(os.environ.get("DIRECT_UPLOAD_TTL", "86400"))  # prazo para finalizar (segundos)
+
+# Status de um upload direto
+PENDING = "pending"
+COMPLETING = "completing"
+COMPLETED = "completed"
+
+
+async def create_direct_upload(data: DirectUploadCreate) -> Dict[str, Any]:
+    """
+    Registra o upload pendente e retorna a URL/formulário assinado do
+    backend configurado. Conteúdo já conhecido (mesmo SHA-256) é
+    reaproveitado sem novo envio.
+    """
+    if data.contentType in ALLOWED_VIDEO_TYPES:
+        kind, max_size = "video", DIRECT_UPLOAD_MAX_SIZE
+    elif data.contentType in ALLOWED_IMAGE_TYPES:
+        kind, max_size = "image", MAX_FILE_SIZE
+    else:
+        raise HTTPException(status_code=400, detail="Tipo de arquivo não permitido")
+
+    if data.size > max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Arquivo muito grande (máx {max_size // (1024 * 1024)}MB)"
+        )
+
+    # O objeto enviado pelo cliente precisa ser lido de volta para conferir
+    # SHA-256 e tipo real antes do registro
+    storage = get_storage()
+    if not (storage.supports_presign and storage.supports_read):
+        raise HTTPException(
+            status_code=409,
+            detail="Armazenamento atual não aceita upload direto; use as sessões de upload"
+        )
+
+    sha256 = data.sha256.lower()
+    folder = safe_folder(data.folder)
+
+    existing = await acquire_media(sha256)
+    if existing:
+        logger.info(f"Mídia reaproveitada no upload direto ({kind}): {existing['url']}")
+        return {"completed": True, "url": existing["url"], "variants": existing.get("variants", [])}
+
+    # Extensão pelo tipo declarado; a finalização exige que o conteúdo real confira
+    presigned = storage.presign_upload(
+        content_key(folder, sha256, data.contentType),
+        data.contentType,
+        data.size,
+        sha256,
+        DIRECT_UPLOAD_URL_TTL,
+        resource_type=kind
+    )
+
+    upload = DirectUpload(
+        filename=data.filename,
+        folder=folder,
+        kind=kind,
+        contentType=data.contentType,
+        size=data.size,
+        sha256=sha256,
+        backend=storage.name,
+        key=presigned.key,
+        expiresAt=datetime.utcnow() + timedelta(seconds=DIRECT_UPLOAD_TTL)
+    )
+
+    uploads_col = await get_direct_uploads_collection()
+    await uploads_col.insert_one(upload.dict())
+
+    logger.info(f"Upload direto autorizado: {upload.id} ({storage.name}, {upload.size} bytes)")
+    return {
+        "completed": False,
+        "id": upload.id,
+        "method": presigned.method,
+        "url": presigned.url,
+        "fields": presigned.fields,
+        "headers": presigned.headers,
+        "urlExpiresAt": datetime.utcnow() + timedelta(seconds=DIRECT_UPLOAD_URL_TTL),
+        "expiresAt": upload.expiresAt
+    }
+
+
+async def get_direct_upload(upload_id: str) -> Dict[str, Any]:
+    uploads_col = await get_direct_uploads_collection()
+    upload = await uploads_col.find_one({"id": upload_id}, {"_id": 0})
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload direto não encontrado")
+    return upload
+
+
+async def _reject(storage, upload: Dict[str, Any], detail: str, status_code: int = 422) -> None:
+    """Remove o objeto inválido e o registro do upload"""
+    await storage.delete(upload["key"])
+    uploads_col = await get_direct_uploads_collection()
+    await uploads_col.delete_one({"id": upload["id"]})
+    logger.warning(f"Upload direto recusado: {upload['id']} ({detail})")
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+async def _reopen(upload_id: str) -> None:
+    uploads_col = await get_direct_uploads_collection()
+    await uploads_col.update_one(
+        {"id": upload_id, "status": COMPLETING},
+        {"$set": {"status": PENDING}}
+    )
+
+
+async def complete_direct_upload(upload_id: str) -> Dict[str, Any]:
+    """
+    Confere o objeto enviado pelo cliente (existência, tamanho, SHA-256 e
+    tipo real pelos magic bytes) e só então o registra na collection de
+    mídia, endereçada pelo SHA-256. Sem checksum informado pelo
+    armazenamento, o objeto é baixado e o hash calculado aqui. Repetir a
+    chamada após a conclusão retorna o mesmo resultado.
+    """
+    uploads_col = await get_direct_uploads_collection()
+    upload = await get_direct_upload(upload_id)
+
+    if upload["status"] == COMPLETED:
+        return upload
+    if upload["status"] != PENDING:
+        raise HTTPException(status_code=409, detail="Upload direto já está sendo finalizado")
+
+    # Transição atômica: só uma finalização por upload
+    upload = await uploads_col.find_one_and_update(
+        {"id": upload_id, "status": PENDING},
+        {"$set": {"status": COMPLETING}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not upload:
+        raise HTTPException(status_code=409, detail="Upload direto já está sendo finalizado")
+    upload.pop("_id", None)
+
+    storage = get_storage(upload["backend"])
+    kind = upload["kind"]
+    local_path = None
+    width = height = None
+    variants = []
+
+    try:
+        if not storage.supports_read:
+            await _reject(storage, upload, "Armazenamento não permite conferir o upload direto", 409)
+
+        stat = await storage.stat(upload["key"])
+        if stat is None:
+            await _reopen(upload_id)
+            raise HTTPException(status_code=409, detail="Arquivo ainda não recebido pelo armazenamento")
+
+        if stat.size != upload["size"]:
+            await _reject(storage, upload, "Tamanho do arquivo não confere")
+        if stat.checksum_sha256 and stat.checksum_sha256 != upload["sha256"]:
+            await _reject(storage, upload, "Checksum do arquivo não confere")
+        if stat.content_type and not stat.content_type.startswith(f"{kind}/"):
+            await _reject(storage, upload, "Conteúdo do arquivo não corresponde ao tipo informado", 400)
+
+        if not stat.checksum_sha256 or (kind == "image" and storage.local_derivatives):
+            # Sem checksum do armazenamento (ex.: multipart), ou imagem para
+            # as versões responsivas: cópia local para conferir o conteúdo
+            os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+            fd, local_path = tempfile.mkstemp(dir=UPLOAD_STAGING_DIR, suffix=".part")
+            os.close(fd)
+            await storage.get_file(upload["key"], local_path)
+            digest = await run_in_threadpool(hash_file, local_path)
+            if digest["sha256"] != upload["sha256"]:
+                await _reject(storage, upload, "Checksum do arquivo não confere")
+            head = digest["head"]
+        else:
+            head = await storage.read_head(upload["key"])
+
+        content_type = sniff_content_type(head)
+        if content_type is None or content_type != canonical_content_type(upload["contentType"]):
+            await _reject(storage, upload, "Conteúdo do arquivo não corresponde ao tipo informado", 400)
+
+        existing = await acquire_media(upload["sha256"])
+        if existing:
+            # Mesmo conteúdo registrado por outro envio: descartar a cópia duplicada
+            if existing.get("key") != upload["key"] or existing.get("backend") != storage.name:
+                await storage.delete(upload["key"])
+            media = existing
+        else:
+            if local_path and kind == "image" and storage.local_derivatives:
+                width, height = await run_in_threadpool(read_image_dimensions, local_path)
+                variants = await store_variants(storage, local_path, upload["folder"], upload["sha256"])
+
+            media = await register_media(
+                upload["sha256"],
+                storage.url_for(upload["key"]),
+                kind,
+                content_type,
+                upload["size"],
+                width=width,
+                height=height,
+                backend=storage.name,
+                key=upload["key"],
+                variants=variants
+            )
+
+    except HTTPException as e:
+        # 409: mesma mídia em remoção (acquire_media); pode tentar de novo
+        if e.status_code >= 500 or e.status_code == 409:
+            await _reopen(upload_id)
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao finalizar upload direto {upload_id}: {str(e)}")
+        await _reopen(upload_id)
+        raise HTTPException(status_code=500, detail="Erro ao finalizar upload")
+    finally:
+        if local_path:
+            try:
+                os.remove(local_path)
+            except FileNotFoundError:
+                pass
+
+    upload = await uploads_col.find_one_and_update(
+        {"id": upload_id},
+        {"$set": {"status": COMPLETED, "url": media["url"], "variants": media.get("variants", [])}},
+        return_document=ReturnDocument.AFTER
+    ) or {**upload, "status": COMPLETED, "url": media["url"], "variants": media.get("variants", [])}
+    upload.pop("_id", None)
+
+    logger.info(f"Upload direto concluído: {upload_id} -> {media['url']}")
+    return upload
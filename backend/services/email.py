@@ -1,8 +1,9 @@
 import os
-import requests
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from models.message import ContactMessage
+from services.http_client import http_client
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +11,46 @@ logger = logging.getLogger(__name__)
 EMAILJS_SERVICE_ID = os.environ.get("EMAILJS_SERVICE_ID", "service_xc7jjjk")
 EMAILJS_TEMPLATE_ID = os.environ.get("EMAILJS_TEMPLATE_ID", "")
 EMAILJS_USER_ID = os.environ.get("EMAILJS_USER_ID", "")
-EMAILJS_URL = "https://api.emailjs.com/api/v1.0/email/send"
+EMAILJS_URL = os.environ.get("EMAILJS_URL", "https://api.emailjs.com/api/v1.0/email/send")
+
+# Circuit breaker para o EmailJS: falhas de rede e respostas 5xx contam
+# como falha; com o circuito aberto as chamadas falham imediatamente
+emailjs_breaker = CircuitBreaker(
+    "emailjs",
+    failure_rate_threshold=float(os.environ.get("EMAIL_CB_FAILURE_RATE", "0.5")),
+    window_seconds=float(os.environ.get("EMAIL_CB_WINDOW_SECONDS", "60")),
+    minimum_calls=int(os.environ.get("EMAIL_CB_MINIMUM_CALLS", "5")),
+    open_seconds=float(os.environ.get("EMAIL_CB_OPEN_SECONDS", "30")),
+    half_open_max_calls=int(os.environ.get("EMAIL_CB_HALF_OPEN_CALLS", "1"))
+)
+
+async def post_to_emailjs(payload: Dict[str, Any]):
+    """
+    Envia payload ao EmailJS através do circuit breaker.
+    Levanta CircuitOpenError se o circuito estiver aberto.
+    """
+    emailjs_breaker.before_call()
+    
+    headers = {
+        "Content-Type": "application/json"
+    }
+    
+    succeeded = None
+    try:
+        response = await http_client.post_json(EMAILJS_URL, payload, headers=headers)
+        succeeded = response.status_code < 500
+        return response
+    except Exception:
+        succeeded = False
+        raise
+    finally:
+        # Sem resultado (CancelledError): apenas libera a reserva do circuito
+        if succeeded is None:
+            emailjs_breaker.release()
+        elif succeeded:
+            emailjs_breaker.record_success()
+        else:
+            emailjs_breaker.record_failure()
 
 async def send_contact_email(message: ContactMessage) -> bool:
     """
@@ -36,13 +76,8 @@ async def send_contact_email(message: ContactMessage) -> bool:
             "template_params": template_params
         }
         
-        # Headers
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
         # Fazer requisição para EmailJS
-        response = requests.post(EMAILJS_URL, json=payload, headers=headers)
+        response = await post_to_emailjs(payload)
         
         if response.status_code == 200:
             logger.info(f"Email enviado com sucesso para {message.email}")
@@ -51,6 +86,8 @@ async def send_contact_email(message: ContactMessage) -> bool:
             logger.error(f"Erro ao enviar email: {response.status_code} - {response.text}")
             return False
             
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Erro ao enviar email: {str(e)}")
         return False
@@ -81,11 +118,7 @@ async def send_admin_notification(message: ContactMessage) -> bool:
             "template_params": template_params
         }
         
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(EMAILJS_URL, json=payload, headers=headers)
+        response = await post_to_emailjs(payload)
         
         if response.status_code == 200:
             logger.info("Notificação enviada para admin")
@@ -94,10 +127,64 @@ async def send_admin_notification(message: ContactMessage) -> bool:
             logger.warning(f"Erro ao enviar notificação admin: {response.status_code}")
             return False
             
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Erro ao enviar notificação admin: {str(e)}")
         return False
 
+async def send_admin_digest(messages: List[ContactMessage]) -> bool:
+    """
+    Envia uma única notificação ao admin resumindo várias mensagens
+    """
+    if len(messages) == 1:
+        return await send_admin_notification(messages[0])
+    
+    try:
+        # Resumo das mensagens para o corpo do email
+        summary = "\n\n".join(
+            f"{m.createdAt.strftime('%d/%m/%Y %H:%M')} - {m.name} <{m.email}>"
+            f" ({m.phone or 'Não informado'})\n{m.subject}\n{m.message}"
+            for m in messages
+        )
+        
+        template_params = {
+            "admin_name": "Jeferson",
+            "client_name": f"{len(messages)} contatos",
+            "client_email": ", ".join(sorted({m.email for m in messages})),
+            "client_phone": "-",
+            "subject": f"{len(messages)} novas mensagens de contato",
+            "message": summary,
+            "date": messages[-1].createdAt.strftime("%d/%m/%Y às %H:%M")
+        }
+        
+        notification_template = os.environ.get(
+            "EMAILJS_DIGEST_TEMPLATE",
+            os.environ.get("EMAILJS_NOTIFICATION_TEMPLATE", EMAILJS_TEMPLATE_ID)
+        )
+        
+        payload = {
+            "service_id": EMAILJS_SERVICE_ID,
+            "template_id": notification_template,
+            "user_id": EMAILJS_USER_ID,
+            "template_params": template_params
+        }
+        
+        response = await post_to_emailjs(payload)
+        
+        if response.status_code == 200:
+            logger.info(f"Resumo de {len(messages)} mensagens enviado para admin")
+            return True
+        else:
+            logger.warning(f"Erro ao enviar resumo admin: {response.status_code}")
+            return False
+            
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao enviar resumo admin: {str(e)}")
+        return False
+
 def validate_email_config() -> Dict[str, Any]:
     """
     Valida se as configurações de email estão corretas
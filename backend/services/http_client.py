@@ -0,0 +1,69 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Configurações do cliente HTTP de saída
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3"))  # segundos
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))  # segundos
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))  # segundos
+HTTP_MAX_CONCURRENCY = int(os.environ.get("HTTP_MAX_CONCURRENCY", "10"))
+
+
+class HttpClient:
+    """
+    Cliente HTTP assíncrono compartilhado: pool de conexões com keep-alive,
+    timeouts explícitos e limite de requisições simultâneas
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT,
+                connect=HTTP_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+        self._semaphore = asyncio.Semaphore(HTTP_MAX_CONCURRENCY)
+        logger.info("Cliente HTTP iniciado")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+            logger.info("Cliente HTTP encerrado")
+
+    async def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """POST com corpo JSON usando o pool compartilhado"""
+        if self._client is None:
+            # Uso fora do lifespan (scripts): inicializa sob demanda
+            await self.start()
+
+        async with self._semaphore:
+            return await self._client.post(url, json=payload, headers=headers)
+
+
+http_client = HttpClient()
@@ -0,0 +1,117 @@
+import os
+import re
+import uuid
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_idempotency_collection
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+IDEMPOTENCY_KEY_TTL = float(os.environ.get("IDEMPOTENCY_KEY_TTL", "86400"))  # segundos
+CONTACT_DEDUPE_WINDOW = float(os.environ.get("CONTACT_DEDUPE_WINDOW", "600"))  # segundos
+IDEMPOTENCY_LEASE = float(os.environ.get("IDEMPOTENCY_LEASE", "30"))  # segundos até outra requisição retomar uma reserva pendente
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Status de uma chave
+PENDING = "pending"
+COMPLETED = "completed"
+
+
+def _normalize(value: str) -> str:
+    return re.sub(r"\s+", " ", (value or "").strip()).lower()
+
+
+def contact_content_hash(email: str, subject: str, message: str) -> str:
+    """Hash do conteúdo normalizado (email, assunto, mensagem)"""
+    normalized = "\x1f".join([_normalize(email), _normalize(subject), _normalize(message)])
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def claim_key(
+    key: str,
+    request_hash: str,
+    ttl_seconds: float,
+    lease_seconds: float = IDEMPOTENCY_LEASE
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Reserva a chave para esta requisição. Retorna (id da reserva, None) se
+    a reserva foi feita agora, ou (None, registro existente) caso contrário.
+
+    A reserva pendente vale até `lockedUntil`; depois disso uma nova
+    tentativa com o mesmo conteúdo a retoma mantendo o id, para que o
+    trabalho já persistido pela tentativa anterior seja reaproveitado.
+    """
+    idempotency_col = await get_idempotency_collection()
+    now = datetime.utcnow()
+    record = {
+        "key": key,
+        "claimId": str(uuid.uuid4()),
+        "requestHash": request_hash,
+        "status": PENDING,
+        "response": None,
+        "createdAt": now,
+        "lockedUntil": now + timedelta(seconds=lease_seconds),
+        "expiresAt": now + timedelta(seconds=ttl_seconds)
+    }
+    
+    try:
+        await idempotency_col.insert_one(record)
+        return record["claimId"], None
+    except DuplicateKeyError:
+        pass
+    
+    # O índice TTL remove expirados com atraso; reaproveitar registro vencido
+    taken_over = await idempotency_col.find_one_and_update(
+        {"key": key, "expiresAt": {"$lte": now}},
+        {"$set": {k: v for k, v in record.items() if k != "key"}}
+    )
+    if taken_over is not None:
+        return record["claimId"], None
+    
+    # Reserva pendente abandonada (processo encerrado, timeout): retomar
+    resumed = await idempotency_col.find_one_and_update(
+        {"key": key, "status": PENDING, "requestHash": request_hash, "lockedUntil": {"$lt": now}},
+        {"$set": {"lockedUntil": record["lockedUntil"]}},
+        return_document=ReturnDocument.AFTER
+    )
+    if resumed is not None:
+        return resumed["claimId"], None
+    
+    existing = await idempotency_col.find_one({"key": key})
+    if existing is None:
+        # Removido entre as operações: tentar novamente uma vez
+        try:
+            await idempotency_col.insert_one(record)
+            return record["claimId"], None
+        except DuplicateKeyError:
+            existing = await idempotency_col.find_one({"key": key})
+    
+    return None, existing
+
+
+async def complete_key(key: str, response: Dict[str, Any]) -> None:
+    """Armazena a resposta para reenvios com a mesma chave"""
+    idempotency_col = await get_idempotency_collection()
+    await idempotency_col.update_one(
+        {"key": key},
+        {
+            "$set": {"status": COMPLETED, "response": response, "completedAt": datetime.utcnow()},
+            "$unset": {"lockedUntil": ""}
+        }
+    )
+
+
+async def release_key(key: str, claim_id: str) -> None:
+    """Libera a reserva após falha sem efeito persistido, permitindo nova tentativa"""
+    try:
+        idempotency_col = await get_idempotency_collection()
+        await idempotency_col.delete_one({"key": key, "claimId": claim_id, "status": PENDING})
+    except Exception as e:
+        logger.error(f"Erro ao liberar chave de idempotência: {str(e)}")
@@ -0,0 +1,144 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+from utils.executor import BoundedExecutor
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow é opcional: sem ele não há derivados
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Larguras (px) e formatos das versões responsivas geradas no armazenamento local
+IMAGE_VARIANT_WIDTHS = sorted({
+    int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "320,640,960,1280,1920").split(",") if w.strip()
+})
+IMAGE_VARIANT_FORMATS = [
+    f.strip().lower() for f in os.environ.get("IMAGE_VARIANT_FORMATS", "avif,webp").split(",") if f.strip()
+]
+IMAGE_VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", "80"))
+IMAGE_VARIANT_TIMEOUT = float(os.environ.get("IMAGE_VARIANT_TIMEOUT", "60"))  # segundos
+
+# Redimensionamento é CPU: pool de processos para escalar entre núcleos
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMAGE_MAX_QUEUE = int(os.environ.get("IMAGE_MAX_QUEUE", "32"))
+
+VARIANT_CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+
+def supported_formats() -> List[str]:
+    """Formatos configurados que o Pillow instalado consegue gravar"""
+    if Image is None:
+        return []
+    return [f for f in IMAGE_VARIANT_FORMATS if f in VARIANT_CONTENT_TYPES and features.check(f)]
+
+
+def generate_variants(
+    source_path: str,
+    output_dir: str,
+    base_name: str,
+    widths: List[int],
+    formats: List[str],
+    quality: int
+) -> List[Dict[str, Any]]:
+    """
+    Gera as versões redimensionadas da imagem (executa no pool de processos).
+    A orientação EXIF é aplicada antes e nenhum metadado é copiado.
+    Larguras maiores que a original são ignoradas; se todas forem, gera
+    uma versão na largura original.
+    """
+    variants = []
+
+    with Image.open(source_path) as source:
+        if getattr(source, "is_animated", False):
+            return variants
+
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.info = {}  # Não propagar EXIF/ICC/XMP para os derivados
+
+        targets = [w for w in widths if w < image.width] or [image.width]
+
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+
+            for fmt in formats:
+                filename = f"{base_name}-{width}w.{fmt}"
+                path = os.path.join(output_dir, filename)
+                tmp_path = f"{path}.part"
+
+                resized.save(tmp_path, format=fmt.upper(), quality=quality)
+                os.replace(tmp_path, path)
+
+                variants.append({
+                    "filename": filename,
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "contentType": VARIANT_CONTENT_TYPES[fmt],
+                    "size": os.path.getsize(path)
+                })
+
+    return variants
+
+
+image_executor: Optional[BoundedExecutor] = None
+
+
+def get_image_executor() -> BoundedExecutor:
+    """Pool de processos criado sob demanda (só quando há imagens locais)"""
+    global image_executor
+    if image_executor is None:
+        image_executor = BoundedExecutor("images", IMAGE_WORKERS, IMAGE_MAX_QUEUE, processes=True)
+    return image_executor
+
+
+async def create_variants(source_path: str, output_dir: str, base_name: str) -> List[Dict[str, Any]]:
+    """
+    Gera os derivados fora do event loop. Falhas não impedem o upload:
+    a imagem original continua servida sem versões responsivas.
+    """
+    formats = supported_formats()
+    if not formats or not IMAGE_VARIANT_WIDTHS:
+        return []
+
+    try:
+        return await get_image_executor().run(
+            generate_variants,
+            source_path,
+            output_dir,
+            base_name,
+            IMAGE_VARIANT_WIDTHS,
+            formats,
+            IMAGE_VARIANT_QUALITY,
+            timeout=IMAGE_VARIANT_TIMEOUT
+        )
+    except Exception as e:
+        logger.warning(f"Versões responsivas não geradas para {base_name}: {e!r}")
+        return []
+
+
+def build_srcset(variants: List[Dict[str, Any]], fmt: str) -> str:
+    """Monta o atributo srcset com as versões de um formato"""
+    return ", ".join(
+        f"{v['url']} {v['width']}w"
+        for v in sorted(variants, key=lambda v: v["width"])
+        if v.get("format") == fmt
+    )
+
+
+def image_stats() -> Dict[str, Any]:
+    """Métricas do pool de processamento de imagens"""
+    return {
+        "formats": supported_formats(),
+        "widths": IMAGE_VARIANT_WIDTHS,
+        **(image_executor.stats() if image_executor else {"in_flight": 0, "queue_depth": 0})
+    }
+
+
+def shutdown_image_executor() -> None:
+    if image_executor is not None:
+        image_executor.shutdown()
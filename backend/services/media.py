@@ -0,0 +1,167 @@
+import os
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_media_collection
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional: sem ele as dimensões locais ficam vazias
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Prazo de uma remoção em andamento; depois disso é considerada interrompida
+MEDIA_DELETE_LEASE = float(os.environ.get("MEDIA_DELETE_LEASE", "300"))  # segundos
+
+
+def read_image_dimensions(path: str) -> Tuple[Optional[int], Optional[int]]:
+    """Lê largura e altura da imagem (apenas o cabeçalho) se Pillow estiver disponível"""
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(path) as image:
+            return image.width, image.height
+    except Exception:
+        return None, None
+
+
+async def acquire_media(content_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Reaproveita a mídia já armazenada com este conteúdo, incrementando
+    a contagem de referências. Retorna None se o conteúdo é novo.
+
+    Enquanto a mídia está sendo removida (begin_media_deletion) o envio é
+    recusado com 409: o arquivo com a mesma chave ainda vai sair do
+    armazenamento. Uma remoção interrompida há mais de MEDIA_DELETE_LEASE
+    tem o registro descartado e o conteúdo é enviado de novo.
+    """
+    media_col = await get_media_collection()
+    media = await media_col.find_one_and_update(
+        {"hash": content_hash, "deletionId": None},
+        {"$inc": {"refCount": 1}, "$set": {"updatedAt": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if media:
+        media.pop("_id", None)
+        return media
+    
+    deleting = await media_col.find_one(
+        {"hash": content_hash, "deletionId": {"$ne": None}},
+        {"_id": 0, "deletionId": 1, "deletingAt": 1}
+    )
+    if deleting is None:
+        return None
+    
+    if deleting["deletingAt"] > datetime.utcnow() - timedelta(seconds=MEDIA_DELETE_LEASE):
+        raise HTTPException(
+            status_code=409,
+            detail="Arquivo com o mesmo conteúdo está sendo removido. Tente novamente em instantes."
+        )
+    
+    await media_col.delete_one({"hash": content_hash, "deletionId": deleting["deletionId"]})
+    logger.warning(f"Remoção interrompida de mídia descartada: {content_hash}")
+    return None
+
+
+async def register_media(
+    content_hash: str,
+    url: str,
+    resource_type: str,
+    content_type: str,
+    size: int,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    backend: Optional[str] = None,
+    key: Optional[str] = None,
+    variants: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Registra mídia recém-armazenada com uma referência. Se outro upload
+    do mesmo conteúdo registrou antes, reaproveita o registro existente.
+    """
+    media_col = await get_media_collection()
+    now = datetime.utcnow()
+    media = {
+        "hash": content_hash,
+        "url": url,
+        "resourceType": resource_type,
+        "contentType": content_type,
+        "size": size,
+        "width": width,
+        "height": height,
+        "backend": backend,
+        "key": key,
+        "variants": variants or [],
+        "refCount": 1,
+        "createdAt": now,
+        "updatedAt": now
+    }
+    
+    try:
+        await media_col.insert_one(media)
+        media.pop("_id", None)
+        return media
+    except DuplicateKeyError:
+        existing = await acquire_media(content_hash)
+        if existing is None:
+            raise
+        return existing
+
+
+async def release_media(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Libera uma referência à mídia. Retorna o registro atualizado, ou None
+    se a URL não pertence a nenhuma mídia registrada.
+    """
+    media_col = await get_media_collection()
+    media = await media_col.find_one_and_update(
+        {"url": url, "refCount": {"$gt": 0}},
+        {"$inc": {"refCount": -1}, "$set": {"updatedAt": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if media:
+        media.pop("_id", None)
+    return media
+
+
+async def begin_media_deletion(content_hash: str) -> Optional[str]:
+    """
+    Marca o registro sem referências como em remoção e retorna o id da
+    remoção. Retorna None se um novo upload do mesmo conteúdo voltou a
+    referenciá-lo (ou outra remoção já começou). O registro só sai em
+    finish_media_deletion, depois dos arquivos.
+    """
+    media_col = await get_media_collection()
+    deletion_id = str(uuid.uuid4())
+    result = await media_col.update_one(
+        {"hash": content_hash, "refCount": {"$lte": 0}, "deletionId": None},
+        {"$set": {"deletionId": deletion_id, "deletingAt": datetime.utcnow()}}
+    )
+    return deletion_id if result.modified_count == 1 else None
+
+
+async def finish_media_deletion(content_hash: str, deletion_id: str) -> None:
+    """Remove o registro marcado por begin_media_deletion"""
+    media_col = await get_media_collection()
+    await media_col.delete_one({"hash": content_hash, "deletionId": deletion_id})
+
+
+async def get_variants_by_url(urls: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Versões responsivas das mídias com as URLs informadas (uma consulta)"""
+    urls = list({url for url in urls if url})
+    if not urls:
+        return {}
+    
+    media_col = await get_media_collection()
+    docs = await media_col.find(
+        {"url": {"$in": urls}},
+        {"_id": 0, "url": 1, "variants": 1}
+    ).to_list(len(urls))
+    return {doc["url"]: doc["variants"] for doc in docs if doc.get("variants")}
@@ -0,0 +1,236 @@
+import os
+import re
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from services.storage import StorageBackend, get_storage
+from utils.database import (
+    get_portfolio_collection, get_projects_collection,
+    get_clients_collection, get_media_collection
+)
+
+logger = logging.getLogger(__name__)
+
+# Coleta de mídia órfã (arquivos no armazenamento sem referência no conteúdo)
+MEDIA_GC_INTERVAL = float(os.environ.get("MEDIA_GC_INTERVAL", "86400"))  # segundos (0 desativa)
+MEDIA_GC_GRACE = float(os.environ.get("MEDIA_GC_GRACE", str(7 * 86400)))  # idade mínima do arquivo (segundos)
+MEDIA_GC_BATCH_SIZE = int(os.environ.get("MEDIA_GC_BATCH_SIZE", "500"))
+# Apenas relatório até o operador habilitar a remoção (MEDIA_GC_DRY_RUN=false)
+MEDIA_GC_DRY_RUN = os.environ.get("MEDIA_GC_DRY_RUN", "true").lower() == "true"
+# Pastas da aplicação no armazenamento; objetos fora delas nunca são candidatos
+MEDIA_GC_PREFIXES = [
+    prefix.strip() for prefix in os.environ.get("MEDIA_GC_PREFIXES", "gaffer-portfolio/,uploads/").split(",")
+    if prefix.strip()
+]
+MEDIA_GC_REPORT_SAMPLE = 50
+
+# Campos com URLs de mídia em cada collection de conteúdo
+MEDIA_REFERENCE_FIELDS = {
+    "portfolio": ["personal.heroImage", "personal.aboutImage", "demoReel.videoUrl", "demoReel.thumbnail"],
+    "projects": ["image", "videoUrl"],
+    "clients": ["logo"]
+}
+
+_COLLECTIONS = {
+    "portfolio": get_portfolio_collection,
+    "projects": get_projects_collection,
+    "clients": get_clients_collection
+}
+
+# Nome endereçado por conteúdo: versões responsivas e sidecars (.br/.gz)
+# compartilham o prefixo SHA-256 do original
+_HASH_PREFIX = re.compile(r"^([0-9a-f]{64})")
+_SIDECAR_SUFFIX = re.compile(r"\.(br|gz)$")
+
+
+def _field_value(document: Dict[str, Any], path: str) -> Optional[str]:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value if isinstance(value, str) and value else None
+
+
+async def collect_referenced_urls() -> Set[str]:
+    """URLs de mídia referenciadas por portfolio, projetos e clientes"""
+    urls: Set[str] = set()
+    for name, fields in MEDIA_REFERENCE_FIELDS.items():
+        collection = await _COLLECTIONS[name]()
+        projection = {"_id": 0, **{field: 1 for field in fields}}
+        async for document in collection.find({}, projection).batch_size(MEDIA_GC_BATCH_SIZE):
+            for field in fields:
+                url = _field_value(document, field)
+                if url:
+                    urls.add(url)
+    return urls
+
+
+async def build_reference_index(storage: StorageBackend, cutoff: datetime) -> Dict[str, Set[str]]:
+    """
+    Índice das chaves em uso no backend: as URLs referenciadas (com as
+    versões responsivas da mídia registrada) e a mídia registrada ou
+    reaproveitada dentro do período de carência, que ainda pode estar a
+    caminho de um projeto.
+    """
+    urls = await collect_referenced_urls()
+    keys: Set[str] = set()
+
+    for url in urls:
+        key = storage.key_for_url(url)
+        if key:
+            keys.add(key)
+
+    media_col = await get_media_collection()
+    query = {"$or": [{"url": {"$in": list(urls)}}, {"updatedAt": {"$gte": cutoff.replace(tzinfo=None)}}]}
+    projection = {"_id": 0, "url": 1, "backend": 1, "key": 1, "variants": 1}
+    async for media in media_col.find(query, projection).batch_size(MEDIA_GC_BATCH_SIZE):
+        if media.get("backend", storage.name) != storage.name:
+            continue
+        key = media.get("key") or storage.key_for_url(media["url"])
+        if key:
+            keys.add(key)
+        for variant in media.get("variants", []):
+            variant_key = variant.get("key") or storage.key_for_url(variant.get("url", ""))
+            if variant_key:
+                keys.add(variant_key)
+
+    hashes = set()
+    for key in keys:
+        match = _HASH_PREFIX.match(key.rsplit("/", 1)[-1])
+        if match:
+            hashes.add(match.group(1))
+
+    return {"keys": keys, "hashes": hashes, "urls": urls}
+
+
+async def registered_keys(storage: StorageBackend, keys: List[str]) -> Set[str]:
+    """
+    Chaves do lote registradas na collection de mídia deste backend
+    (originais e versões responsivas); só elas podem ser removidas
+    """
+    lookup = {_SIDECAR_SUFFIX.sub("", key) for key in keys}
+    urls = {storage.url_for(key): key for key in lookup}
+    media_col = await get_media_collection()
+    query = {"$or": [
+        {"backend": storage.name, "key": {"$in": list(lookup)}},
+        {"backend": storage.name, "variants.key": {"$in": list(lookup)}},
+        {"url": {"$in": list(urls)}},
+        {"variants.url": {"$in": list(urls)}}
+    ]}
+    projection = {"_id": 0, "url": 1, "key": 1, "variants": 1}
+
+    registered: Set[str] = set()
+    async for media in media_col.find(query, projection):
+        for entry in [media] + media.get("variants", []):
+            if entry.get("key") in lookup:
+                registered.add(entry["key"])
+            if entry.get("url") in urls:
+                registered.add(urls[entry["url"]])
+    return {key for key in keys if _SIDECAR_SUFFIX.sub("", key) in registered}
+
+
+def _is_referenced(key: str, index: Dict[str, Set[str]]) -> bool:
+    if key in index["keys"] or _SIDECAR_SUFFIX.sub("", key) in index["keys"]:
+        return True
+    match = _HASH_PREFIX.match(key.rsplit("/", 1)[-1])
+    return bool(match and match.group(1) in index["hashes"])
+
+
+async def _delete_orphans(storage: StorageBackend, keys: List[str]) -> int:
+    """Remove os objetos e os registros de mídia correspondentes"""
+    deleted = await storage.delete_many(keys)
+    media_col = await get_media_collection()
+    await media_col.delete_many({
+        "$or": [
+            {"backend": storage.name, "key": {"$in": keys}},
+            {"url": {"$in": [storage.url_for(key) for key in keys]}}
+        ]
+    })
+    return deleted
+
+
+async def gc_orphan_media(
+    dry_run: Optional[bool] = None,
+    backend: Optional[str] = None,
+    grace_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Compara a listagem das pastas da aplicação (MEDIA_GC_PREFIXES, em
+    lotes) com o índice de referências e remove, em lote, os objetos
+    órfãos mais antigos que o período de carência. Só são candidatos os
+    objetos registrados na collection de mídia; os demais entram no
+    relatório como não registrados. Com `dry_run` apenas gera o relatório.
+    """
+    dry_run = MEDIA_GC_DRY_RUN if dry_run is None else dry_run
+    grace_seconds = MEDIA_GC_GRACE if grace_seconds is None else grace_seconds
+    storage = get_storage(backend)
+    started = time.perf_counter()
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+
+    index = await build_reference_index(storage, cutoff)
+
+    report = {
+        "backend": storage.name,
+        "dryRun": dry_run,
+        "graceSeconds": grace_seconds,
+        "prefixes": MEDIA_GC_PREFIXES,
+        "referencedUrls": len(index["urls"]),
+        "scanned": 0,
+        "referenced": 0,
+        "recent": 0,
+        "unregistered": 0,
+        "orphans": 0,
+        "orphanBytes": 0,
+        "deleted": 0,
+        "sample": []
+    }
+    pending: List[str] = []
+
+    for prefix in MEDIA_GC_PREFIXES:
+        async for batch in storage.list_objects(MEDIA_GC_BATCH_SIZE, prefix=prefix):
+            report["scanned"] += len(batch)
+            candidates = []
+            for obj in batch:
+                if _is_referenced(obj.key, index):
+                    report["referenced"] += 1
+                    continue
+                # Sem data ou dentro da carência: upload possivelmente em andamento
+                if obj.modified is None or obj.modified > cutoff:
+                    report["recent"] += 1
+                    continue
+                candidates.append(obj)
+
+            registered = await registered_keys(storage, [obj.key for obj in candidates]) if candidates else set()
+            for obj in candidates:
+                # Fora do registro de mídia: não foi gravado pela aplicação
+                if obj.key not in registered:
+                    report["unregistered"] += 1
+                    continue
+
+                report["orphans"] += 1
+                report["orphanBytes"] += obj.size
+                if len(report["sample"]) < MEDIA_GC_REPORT_SAMPLE:
+                    report["sample"].append({"key": obj.key, "size": obj.size, "modified": obj.modified})
+                if not dry_run:
+                    pending.append(obj.key)
+
+            if len(pending) >= MEDIA_GC_BATCH_SIZE:
+                report["deleted"] += await _delete_orphans(storage, pending)
+                pending = []
+
+    if pending:
+        report["deleted"] += await _delete_orphans(storage, pending)
+
+    report["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+
+    if report["orphans"]:
+        logger.info(
+            f"GC de mídia ({storage.name}{', simulação' if dry_run else ''}): "
+            f"{report['orphans']} órfãos ({report['orphanBytes']} bytes), "
+            f"{report['deleted']} removidos de {report['scanned']} objetos"
+        )
+    return report
+
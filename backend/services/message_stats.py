@@ -0,0 +1,104 @@
+import os
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from utils.database import get_messages_collection, get_stats_collection
+
+logger = logging.getLogger(__name__)
+
+# Documento de contadores das mensagens de contato
+MESSAGE_STATS_ID = "messages"
+MESSAGE_STATS_RECONCILE_INTERVAL = float(
+    os.environ.get("MESSAGE_STATS_RECONCILE_INTERVAL", "3600")
+)  # segundos
+
+
+async def record_new_message() -> None:
+    """Incrementa contadores para uma nova mensagem (não lida, não respondida)"""
+    try:
+        stats_col = await get_stats_collection()
+        await stats_col.update_one(
+            {"_id": MESSAGE_STATS_ID},
+            {"$inc": {"total": 1, "unread": 1, "replied": 0}},
+            upsert=True
+        )
+    except Exception as e:
+        # A reconciliação periódica corrige eventuais divergências
+        logger.error(f"Erro ao atualizar contadores de mensagens: {str(e)}")
+
+
+async def record_message_update(before: Dict[str, Any], update_data: Dict[str, Any]) -> None:
+    """Ajusta contadores a partir do estado anterior e dos campos alterados"""
+    increments = {}
+    
+    if "read" in update_data and bool(before.get("read")) != update_data["read"]:
+        increments["unread"] = -1 if update_data["read"] else 1
+    
+    if "replied" in update_data and bool(before.get("replied")) != update_data["replied"]:
+        increments["replied"] = 1 if update_data["replied"] else -1
+    
+    if not increments:
+        return
+    
+    try:
+        stats_col = await get_stats_collection()
+        await stats_col.update_one(
+            {"_id": MESSAGE_STATS_ID},
+            {"$inc": increments},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Erro ao atualizar contadores de mensagens: {str(e)}")
+
+
+async def reconcile_message_stats() -> Dict[str, int]:
+    """Recalcula os contadores a partir da collection de mensagens"""
+    messages_col = await get_messages_collection()
+    stats_col = await get_stats_collection()
+    
+    result = await messages_col.aggregate([
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "unread": {"$sum": {"$cond": [{"$eq": ["$read", True]}, 0, 1]}},
+            "replied": {"$sum": {"$cond": [{"$eq": ["$replied", True]}, 1, 0]}}
+        }}
+    ]).to_list(1)
+    
+    counts = {"total": 0, "unread": 0, "replied": 0}
+    if result:
+        counts = {key: result[0][key] for key in counts}
+    
+    await stats_col.update_one(
+        {"_id": MESSAGE_STATS_ID},
+        {"$set": {**counts, "reconciledAt": datetime.utcnow()}},
+        upsert=True
+    )
+    
+    logger.info(f"Contadores de mensagens reconciliados: {counts}")
+    return counts
+
+
+async def get_message_counts() -> Dict[str, int]:
+    """Retorna contadores (O(1)); reconcilia se ainda não existirem"""
+    stats_col = await get_stats_collection()
+    stats = await stats_col.find_one({"_id": MESSAGE_STATS_ID})
+    
+    if not stats or "total" not in stats:
+        return await reconcile_message_stats()
+    
+    return {
+        "total": stats.get("total", 0),
+        "unread": stats.get("unread", 0),
+        "replied": stats.get("replied", 0)
+    }
+
+
+def count_for_filter(counts: Dict[str, int], read: Optional[bool]) -> int:
+    """Total correspondente ao filtro `read` de GET /admin/messages"""
+    if read is None:
+        return counts["total"]
+    if read:
+        return counts["total"] - counts["unread"]
+    return counts["unread"]
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Item do buffer: (item da fila, mensagem)
+DigestItem = Tuple[Dict[str, Any], Any]
+FlushHandler = Callable[[List[DigestItem]], Awaitable[bool]]
+
+
+class DigestNotifier:
+    """
+    Agrupa notificações em janelas: o primeiro item abre uma janela de
+    `window_seconds`; ao fim dela (ou ao atingir `max_items`) todos os
+    itens acumulados são entregues de uma vez ao `on_flush`
+    """
+
+    def __init__(
+        self,
+        on_flush: FlushHandler,
+        window_seconds: float = 30.0,
+        max_items: int = 20,
+        history_size: int = 20
+    ):
+        self.on_flush = on_flush
+        self.window_seconds = window_seconds
+        self.max_items = max(1, max_items)
+
+        self._buffer: List[DigestItem] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+
+        self.windows = 0
+        self.items = 0
+        self.failed_windows = 0
+        self.history: deque = deque(maxlen=history_size)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def add(self, item: DigestItem) -> None:
+        """Adiciona item ao buffer da janela atual"""
+        self._buffer.append(item)
+
+        if len(self._buffer) >= self.max_items or self.window_seconds <= 0:
+            # Separa o lote agora para que a janela não passe de max_items
+            batch = self._take()
+            task = asyncio.create_task(self._deliver(batch, "size"))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_after_window())
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window_seconds)
+        # Janela encerrada: a entrega passa a ser acompanhada como as demais,
+        # para que close() a aguarde mesmo depois de _timer ser liberado
+        task = asyncio.current_task()
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+        self._timer = None
+        await self._deliver(self._take(), "window")
+
+    def _take(self) -> List[DigestItem]:
+        """Retira o lote atual do buffer e encerra a janela"""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    async def flush(self, reason: str = "manual") -> None:
+        """Entrega imediatamente os itens acumulados"""
+        await self._deliver(self._take(), reason)
+
+    async def _deliver(self, batch: List[DigestItem], reason: str) -> None:
+        if not batch:
+            return
+
+        started = datetime.utcnow()
+        try:
+            delivered = await self.on_flush(batch)
+        except Exception as e:
+            logger.error(f"Erro ao entregar resumo de notificações: {str(e)}")
+            delivered = False
+
+        self.windows += 1
+        self.items += len(batch)
+        if not delivered:
+            self.failed_windows += 1
+        self.history.append({
+            "flushedAt": started.isoformat(),
+            "items": len(batch),
+            "reason": reason,
+            "delivered": delivered
+        })
+
+    async def close(self) -> None:
+        """Hook de encerramento: entrega o buffer e aguarda entregas em andamento"""
+        await self.flush("shutdown")
+        if self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "max_items": self.max_items,
+            "buffered": len(self._buffer),
+            "windows": self.windows,
+            "items": self.items,
+            "calls_saved": self.items - self.windows,
+            "failed_windows": self.failed_windows,
+            "recent_windows": list(self.history)
+        }
@@ -0,0 +1,396 @@
+import os
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from models.message import ContactMessage
+from utils.database import get_outbox_collection, get_messages_collection
+from services.email import send_contact_email, send_admin_digest
+from services.circuit_breaker import CircuitOpenError
+from services.notifier import DigestNotifier
+
+logger = logging.getLogger(__name__)
+
+# Configurações da fila de emails
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_BASE = float(os.environ.get("OUTBOX_BACKOFF_BASE", "5"))  # segundos
+OUTBOX_BACKOFF_MAX = float(os.environ.get("OUTBOX_BACKOFF_MAX", "900"))  # segundos
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", "5"))  # segundos
+OUTBOX_LOCK_TIMEOUT = float(os.environ.get("OUTBOX_LOCK_TIMEOUT", "120"))  # segundos
+OUTBOX_DRAIN_TIMEOUT = float(os.environ.get("OUTBOX_DRAIN_TIMEOUT", "10"))  # segundos
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "10"))  # entregas simultâneas
+OUTBOX_ENQUEUE_GRACE = float(os.environ.get("OUTBOX_ENQUEUE_GRACE", "30"))  # segundos até o worker enfileirar mensagens sem emails
+OUTBOX_ERROR_BACKOFF = float(os.environ.get("OUTBOX_ERROR_BACKOFF", "5"))  # pausa do worker após erro inesperado (segundos)
+
+# Notificações do admin agrupadas em resumo; a janela fica abaixo do
+# OUTBOX_LOCK_TIMEOUT para que itens no buffer não voltem à fila
+ADMIN_DIGEST_WINDOW = min(
+    float(os.environ.get("ADMIN_DIGEST_WINDOW", "30")),
+    OUTBOX_LOCK_TIMEOUT / 2
+)  # segundos
+ADMIN_DIGEST_MAX_MESSAGES = int(os.environ.get("ADMIN_DIGEST_MAX_MESSAGES", "20"))
+
+# Status dos itens da fila
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+# Tipos de email enviados por mensagem de contato
+KIND_CONTACT = "contact"
+KIND_ADMIN_NOTIFICATION = "admin_notification"
+
+
+
+def backoff_delay(attempts: int) -> float:
+    """Backoff exponencial com jitter para a tentativa `attempts`"""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def outbox_id(message_id: str, kind: str) -> str:
+    """Id do item da fila derivado da mensagem: no máximo um email de cada tipo"""
+    return f"{message_id}:{kind}"
+
+
+async def _enqueue_email(message_id: str, kind: str, now: datetime) -> None:
+    outbox_col = await get_outbox_collection()
+    try:
+        await outbox_col.update_one(
+            {"id": outbox_id(message_id, kind)},
+            {"$setOnInsert": {
+                "messageId": message_id,
+                "kind": kind,
+                "status": PENDING,
+                "attempts": 0,
+                "nextAttemptAt": now,
+                "lastError": None,
+                "createdAt": now,
+                "updatedAt": now
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Upsert concorrente (rota e worker) já criou o item
+        pass
+
+
+async def enqueue_message_emails(message_id: str) -> None:
+    """
+    Enfileira os emails de uma mensagem de contato já gravada. Idempotente:
+    repetir (pela rota ou pelo worker, para mensagens gravadas com
+    `emailsQueued` falso) não duplica entregas.
+    """
+    now = datetime.utcnow()
+    await asyncio.gather(*(
+        _enqueue_email(message_id, kind, now)
+        for kind in (KIND_CONTACT, KIND_ADMIN_NOTIFICATION)
+    ))
+
+    messages_col = await get_messages_collection()
+    await messages_col.update_one({"id": message_id}, {"$set": {"emailsQueued": True}})
+
+    outbox_worker.wake()
+
+
+class OutboxWorker:
+    """
+    Entrega os emails enfileirados em segundo plano, com retentativas,
+    backoff exponencial e estado final `dead` após OUTBOX_MAX_ATTEMPTS
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake_event = asyncio.Event()
+        self._draining = False
+        self.metrics = {"sent": 0, "failed": 0, "dead": 0, "deferred": 0}
+        self.admin_digest = DigestNotifier(
+            self._deliver_admin_digest,
+            window_seconds=ADMIN_DIGEST_WINDOW,
+            max_items=ADMIN_DIGEST_MAX_MESSAGES
+        )
+
+    def wake(self) -> None:
+        """Acorda o worker quando novos itens são enfileirados"""
+        self._wake_event.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._draining = False
+            self._task = asyncio.create_task(self._run(), name="email_outbox")
+            logger.info("Worker da fila de emails iniciado")
+
+    async def stop(self, timeout: float = OUTBOX_DRAIN_TIMEOUT) -> None:
+        """Entrega os itens já vencidos e encerra (limitado por `timeout`)"""
+        if self._task is None:
+            return
+
+        self._draining = True
+        self.wake()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            # Itens em "sending" voltam para a fila via OUTBOX_LOCK_TIMEOUT
+            logger.warning("Fila de emails não esvaziou a tempo no encerramento")
+        except Exception as e:
+            logger.error(f"Erro ao encerrar worker da fila de emails: {str(e)}")
+        finally:
+            self._task = None
+
+        logger.info("Worker da fila de emails encerrado")
+
+    async def _run(self) -> None:
+        await self._release_stale_locks()
+        await self._enqueue_missing()
+
+        while True:
+            try:
+                jobs = await self._claim_batch()
+
+                if jobs:
+                    # Entregas simultâneas (ex.: email de contato e notificação
+                    # da mesma mensagem saem em paralelo)
+                    await asyncio.gather(*(self._deliver(job) for job in jobs))
+                    continue
+
+                if self._draining:
+                    await self.admin_digest.close()
+                    return
+
+                self._wake_event.clear()
+                idle_timeout = await self._idle_timeout()
+                try:
+                    await asyncio.wait_for(self._wake_event.wait(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    await self._release_stale_locks()
+                    await self._enqueue_missing()
+            except Exception as e:
+                # O worker não pode morrer por uma falha pontual (ex.: banco indisponível)
+                logger.error(f"Erro no worker da fila de emails: {str(e)}")
+                if self._draining:
+                    return
+                await asyncio.sleep(OUTBOX_ERROR_BACKOFF)
+
+    async def _claim_batch(self) -> List[Dict[str, Any]]:
+        jobs = []
+        try:
+            while len(jobs) < OUTBOX_BATCH_SIZE:
+                job = await self._claim_next()
+                if job is None:
+                    break
+                jobs.append(job)
+        except Exception as e:
+            logger.error(f"Erro ao buscar item da fila de emails: {str(e)}")
+        return jobs
+
+    async def _claim_next(self) -> Optional[Dict[str, Any]]:
+        outbox_col = await get_outbox_collection()
+        now = datetime.utcnow()
+
+        return await outbox_col.find_one_and_update(
+            {"status": PENDING, "nextAttemptAt": {"$lte": now}},
+            {"$set": {"status": SENDING, "lockedAt": now, "updatedAt": now}},
+            sort=[("nextAttemptAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _idle_timeout(self) -> float:
+        """Espera até o próximo item agendado, limitada a OUTBOX_POLL_INTERVAL"""
+        try:
+            outbox_col = await get_outbox_collection()
+            next_job = await outbox_col.find_one(
+                {"status": PENDING},
+                {"nextAttemptAt": 1},
+                sort=[("nextAttemptAt", 1)]
+            )
+        except Exception:
+            return OUTBOX_POLL_INTERVAL
+
+        if not next_job:
+            return OUTBOX_POLL_INTERVAL
+
+        due_in = (next_job["nextAttemptAt"] - datetime.utcnow()).total_seconds()
+        return min(OUTBOX_POLL_INTERVAL, max(0.01, due_in))
+
+    async def _release_stale_locks(self) -> None:
+        """Devolve à fila itens presos em "sending" (ex.: processo encerrado no meio)"""
+        try:
+            outbox_col = await get_outbox_collection()
+            cutoff = datetime.utcnow() - timedelta(seconds=OUTBOX_LOCK_TIMEOUT)
+            await outbox_col.update_many(
+                {"status": SENDING, "lockedAt": {"$lt": cutoff}},
+                {"$set": {"status": PENDING, "updatedAt": datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.error(f"Erro ao liberar itens da fila de emails: {str(e)}")
+
+    async def _enqueue_missing(self) -> None:
+        """Enfileira emails de mensagens gravadas cujo enfileiramento pela rota falhou"""
+        try:
+            messages_col = await get_messages_collection()
+            cutoff = datetime.utcnow() - timedelta(seconds=OUTBOX_ENQUEUE_GRACE)
+            cursor = messages_col.find(
+                {"emailsQueued": False, "createdAt": {"$lt": cutoff}},
+                {"_id": 0, "id": 1}
+            ).limit(OUTBOX_BATCH_SIZE * 10)
+            async for message in cursor:
+                await enqueue_message_emails(message["id"])
+                logger.info(f"Emails da mensagem {message['id']} enfileirados pelo worker")
+        except Exception as e:
+            logger.error(f"Erro ao enfileirar emails pendentes: {str(e)}")
+
+    async def _deliver(self, job: Dict[str, Any]) -> None:
+        """
+        Entrega um item; erros ao atualizar a fila são registrados e o item
+        fica em "sending" até OUTBOX_LOCK_TIMEOUT, sem afetar os demais
+        """
+        try:
+            await self._deliver_job(job)
+        except Exception as e:
+            logger.error(f"Erro ao processar email {job['kind']} da mensagem {job['messageId']}: {str(e)}")
+
+    async def _deliver_job(self, job: Dict[str, Any]) -> None:
+        messages_col = await get_messages_collection()
+        message = await messages_col.find_one({"id": job["messageId"]})
+
+        if not message:
+            await self._finish(job, DEAD, "Mensagem não encontrada")
+            return
+
+        if job["kind"] == KIND_ADMIN_NOTIFICATION:
+            # Entregue no resumo da janela atual
+            self.admin_digest.add((job, ContactMessage(**message)))
+            return
+
+        error = "Falha no envio"
+        try:
+            sent = await send_contact_email(ContactMessage(**message))
+        except CircuitOpenError as e:
+            # Provedor indisponível: reagendar sem consumir tentativa
+            await self._defer(job, e.retry_after)
+            return
+        except Exception as e:
+            sent, error = False, str(e)
+
+        if sent:
+            # Fora do try do envio: falha ao gravar o status não gera reenvio
+            await self._mark_sent([job])
+        else:
+            await self._retry_or_dead(job, error)
+
+    async def _deliver_admin_digest(self, batch: List[Tuple[Dict[str, Any], ContactMessage]]) -> bool:
+        """Envia um resumo com as notificações acumuladas e atualiza a fila"""
+        jobs = [job for job, _ in batch]
+        error = "Falha no envio"
+        try:
+            delivered = await send_admin_digest([message for _, message in batch])
+        except CircuitOpenError as e:
+            await self._settle(jobs, [self._defer(job, e.retry_after) for job in jobs], "adiar")
+            return False
+        except Exception as e:
+            delivered, error = False, str(e)
+
+        if delivered:
+            await self._mark_sent(jobs)
+        else:
+            await self._settle(
+                jobs, [self._retry_or_dead(job, error) for job in jobs], "reagendar"
+            )
+        return delivered
+
+    async def _mark_sent(self, jobs: List[Dict[str, Any]]) -> None:
+        """
+        Marca itens já enviados como `sent`. Se a gravação falhar o email
+        não é reenviado agora: o item fica em "sending" até OUTBOX_LOCK_TIMEOUT
+        """
+        await self._settle(jobs, [self._finish(job, SENT) for job in jobs], "marcar como enviado")
+
+    async def _settle(self, jobs: List[Dict[str, Any]], updates: List[Any], action: str) -> None:
+        """Executa as atualizações da fila em paralelo, registrando as que falharem"""
+        results = await asyncio.gather(*updates, return_exceptions=True)
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Erro ao {action} email {job['kind']} da mensagem {job['messageId']}: {str(result)}"
+                )
+
+    async def _defer(self, job: Dict[str, Any], delay: float) -> None:
+        outbox_col = await get_outbox_collection()
+        now = datetime.utcnow()
+
+        await outbox_col.update_one(
+            {"id": job["id"]},
+            {
+                "$set": {
+                    "status": PENDING,
+                    "nextAttemptAt": now + timedelta(seconds=max(1.0, delay)),
+                    "updatedAt": now
+                },
+                "$unset": {"lockedAt": ""}
+            }
+        )
+        self.metrics["deferred"] += 1
+
+    async def _finish(
+        self,
+        job: Dict[str, Any],
+        status: str,
+        error: Optional[str] = None,
+        attempts: Optional[int] = None
+    ) -> None:
+        outbox_col = await get_outbox_collection()
+        now = datetime.utcnow()
+
+        update = {"status": status, "updatedAt": now, "lastError": error}
+        if status == SENT:
+            update["sentAt"] = now
+        if attempts is not None:
+            update["attempts"] = attempts
+
+        await outbox_col.update_one(
+            {"id": job["id"]},
+            {"$set": update, "$unset": {"lockedAt": ""}}
+        )
+        self.metrics["sent" if status == SENT else "dead"] += 1
+
+    async def _retry_or_dead(self, job: Dict[str, Any], error: str) -> None:
+        attempts = job.get("attempts", 0) + 1
+        self.metrics["failed"] += 1
+
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Email {job['kind']} da mensagem {job['messageId']} descartado: {error}")
+            await self._finish(job, DEAD, error, attempts=attempts)
+            return
+
+        outbox_col = await get_outbox_collection()
+        now = datetime.utcnow()
+
+        await outbox_col.update_one(
+            {"id": job["id"]},
+            {
+                "$set": {
+                    "status": PENDING,
+                    "attempts": attempts,
+                    "nextAttemptAt": now + timedelta(seconds=backoff_delay(attempts)),
+                    "lastError": error,
+                    "updatedAt": now
+                },
+                "$unset": {"lockedAt": ""}
+            }
+        )
+        logger.warning(f"Email {job['kind']} da mensagem {job['messageId']} reagendado (tentativa {attempts})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            **self.metrics,
+            "admin_digest": self.admin_digest.stats()
+        }
+
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,354 @@
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from pymongo import ReturnDocument
+
+from utils.database import (
+    get_portfolio_collection,
+    get_projects_collection,
+    get_clients_collection,
+    get_snapshot_collection
+)
+from services.cache import invalidate_portfolio_cache
+from services.media import get_variants_by_url
+from services.images import build_srcset
+
+logger = logging.getLogger(__name__)
+
+# Documento único com o payload público pré-montado
+SNAPSHOT_ID = "public"
+
+# Modo de execução das consultas: "facet" (uma ida ao banco, concorrente)
+# ou "sequential" (uma consulta por vez)
+PORTFOLIO_QUERY_MODE = os.environ.get("PORTFOLIO_QUERY_MODE", "facet")
+
+# Limites das listas públicas
+FEATURED_LIMIT = 10
+RECENT_LIMIT = 10
+CLIENTS_LIMIT = 20
+
+# Projeções com apenas os campos emitidos por format_project/format_client
+PORTFOLIO_PROJECTION = {"_id": 0, "personal": 1, "demoReel": 1, "services": 1}
+PROJECT_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "client": 1, "year": 1, "category": 1,
+    "description": 1, "image": 1, "featured": 1, "videoUrl": 1, "date": 1
+}
+CLIENT_PROJECTION = {"_id": 0, "id": 1, "name": 1, "logo": 1, "website": 1}
+
+
+async def build_portfolio_payload(mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Monta o payload público a partir das collections
+    """
+    if (mode or PORTFOLIO_QUERY_MODE) == "sequential":
+        return await build_portfolio_payload_sequential()
+    return await build_portfolio_payload_facet()
+
+
+async def build_portfolio_payload_facet() -> Dict[str, Any]:
+    """
+    Monta o payload em uma única ida ao banco: portfólio, projetos ($facet)
+    e clientes são consultados concorrentemente, já com projeção
+    """
+    portfolio_col = await get_portfolio_collection()
+    projects_col = await get_projects_collection()
+    clients_col = await get_clients_collection()
+    
+    # Destaques e recentes em uma única agregação
+    projects_pipeline = [
+        {"$match": {"featured": {"$in": [True, False]}}},
+        {"$sort": {"createdAt": -1}},
+        {"$project": PROJECT_PROJECTION},
+        {"$facet": {
+            "featured": [{"$match": {"featured": True}}, {"$limit": FEATURED_LIMIT}],
+            "recent": [{"$match": {"featured": False}}, {"$limit": RECENT_LIMIT}]
+        }}
+    ]
+    
+    portfolio_data, project_lists, clients = await asyncio.gather(
+        portfolio_col.find_one({}, PORTFOLIO_PROJECTION),
+        projects_col.aggregate(projects_pipeline).to_list(1),
+        clients_col.find(
+            {"active": True}, CLIENT_PROJECTION
+        ).sort("order", 1).to_list(CLIENTS_LIMIT)
+    )
+    
+    if not portfolio_data:
+        # Retornar dados padrão se não existir
+        portfolio_data = await create_default_portfolio()
+    
+    project_lists = project_lists[0] if project_lists else {}
+    variants = await get_variants_by_url(
+        p.get("image") for p in project_lists.get("featured", []) + project_lists.get("recent", [])
+    )
+    
+    return {
+        "personal": portfolio_data.get("personal", {}),
+        "demoReel": portfolio_data.get("demoReel", {}),
+        "services": portfolio_data.get("services", []),
+        "featuredWorks": [format_project(p, variants) for p in project_lists.get("featured", [])],
+        "recentProjects": [format_project(p, variants) for p in project_lists.get("recent", [])],
+        "clients": [format_client(c) for c in clients]
+    }
+
+
+async def build_portfolio_payload_sequential() -> Dict[str, Any]:
+    """
+    Monta o payload com uma consulta por vez (modo original)
+    """
+    # Collections
+    portfolio_col = await get_portfolio_collection()
+    projects_col = await get_projects_collection()
+    clients_col = await get_clients_collection()
+    
+    # Buscar dados do portfólio
+    portfolio_data = await portfolio_col.find_one()
+    if not portfolio_data:
+        # Retornar dados padrão se não existir
+        portfolio_data = await create_default_portfolio()
+    
+    # Buscar projetos em destaque
+    featured_projects = await projects_col.find(
+        {"featured": True}
+    ).sort("createdAt", -1).to_list(FEATURED_LIMIT)
+    
+    # Buscar projetos recentes
+    recent_projects = await projects_col.find(
+        {"featured": False}
+    ).sort("createdAt", -1).to_list(RECENT_LIMIT)
+    
+    # Buscar clientes ativos
+    clients = await clients_col.find(
+        {"active": True}
+    ).sort("order", 1).to_list(CLIENTS_LIMIT)
+    
+    # Versões responsivas das imagens dos projetos
+    variants = await get_variants_by_url(p.get("image") for p in featured_projects + recent_projects)
+    
+    # Formatar resposta
+    return {
+        "personal": portfolio_data.get("personal", {}),
+        "demoReel": portfolio_data.get("demoReel", {}),
+        "services": portfolio_data.get("services", []),
+        "featuredWorks": [format_project(p, variants) for p in featured_projects],
+        "recentProjects": [format_project(p, variants) for p in recent_projects],
+        "clients": [format_client(c) for c in clients]
+    }
+
+
+async def rebuild_portfolio_snapshot() -> Dict[str, Any]:
+    """
+    Recompõe o payload público e grava no documento de snapshot.
+
+    Cada rebuild reserva um número de sequência antes de ler as collections;
+    a gravação só acontece se nenhum rebuild mais recente já tiver gravado,
+    então rebuilds concorrentes (inclusive entre workers) nunca deixam um
+    snapshot mais antigo por cima de um mais novo.
+    """
+    snapshot_col = await get_snapshot_collection()
+    
+    reserved = await snapshot_col.find_one_and_update(
+        {"_id": SNAPSHOT_ID},
+        {"$inc": {"buildSeq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    build_seq = reserved["buildSeq"]
+    
+    payload = await build_portfolio_payload()
+    # Precisão do BSON (milissegundos): o valor retornado é igual ao lido depois
+    now = datetime.utcnow()
+    updated_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    
+    await snapshot_col.update_one(
+        {
+            "_id": SNAPSHOT_ID,
+            "$or": [
+                {"version": {"$lt": build_seq}},
+                {"version": {"$exists": False}}
+            ]
+        },
+        {"$set": {
+            "payload": payload,
+            "version": build_seq,
+            "updatedAt": updated_at
+        }}
+    )
+    
+    logger.info(f"Snapshot do portfólio reconstruído (versão {build_seq})")
+    
+    return {"payload": payload, "version": build_seq, "updatedAt": updated_at}
+
+
+async def get_portfolio_snapshot() -> Dict[str, Any]:
+    """
+    Retorna o snapshot público, reconstruindo se ainda não existir
+    """
+    snapshot_col = await get_snapshot_collection()
+    snapshot = await snapshot_col.find_one({"_id": SNAPSHOT_ID})
+    
+    if not snapshot or "payload" not in snapshot:
+        return await rebuild_portfolio_snapshot()
+    
+    return snapshot
+
+
+async def get_snapshot_marker() -> Optional[tuple]:
+    """
+    Versão e updatedAt do snapshot (leitura por _id, só esses campos).
+    Usada para validar o cache em memória de cada worker, já que a
+    invalidação local não alcança os demais processos.
+    """
+    snapshot_col = await get_snapshot_collection()
+    snapshot = await snapshot_col.find_one(
+        {"_id": SNAPSHOT_ID},
+        {"_id": 0, "version": 1, "updatedAt": 1}
+    )
+    
+    if not snapshot:
+        return None
+    
+    return (snapshot.get("version", 0), snapshot.get("updatedAt"))
+
+
+async def get_content_version() -> Dict[str, Any]:
+    """
+    Retorna a versão de conteúdo (versão e updatedAt do snapshot), que muda
+    a cada escrita do admin em portfolio, projects ou clients
+    """
+    snapshot_col = await get_snapshot_collection()
+    snapshot = await snapshot_col.find_one(
+        {"_id": SNAPSHOT_ID},
+        {"version": 1, "updatedAt": 1}
+    )
+    
+    if not snapshot or "updatedAt" not in snapshot:
+        snapshot = await rebuild_portfolio_snapshot()
+    
+    return {"version": snapshot.get("version", 0), "updatedAt": snapshot["updatedAt"]}
+
+
+async def refresh_portfolio_snapshot() -> None:
+    """
+    Chamado após escritas do admin em portfolio, projects ou clients
+    """
+    try:
+        await rebuild_portfolio_snapshot()
+    except Exception as e:
+        logger.error(f"Erro ao reconstruir snapshot do portfólio: {str(e)}")
+        # Descartar payload para que a próxima leitura reconstrua
+        try:
+            snapshot_col = await get_snapshot_collection()
+            await snapshot_col.update_one(
+                {"_id": SNAPSHOT_ID},
+                {"$unset": {"payload": ""}, "$set": {"updatedAt": datetime.utcnow()}}
+            )
+        except Exception as unset_error:
+            logger.error(f"Erro ao descartar snapshot do portfólio: {str(unset_error)}")
+    finally:
+        invalidate_portfolio_cache()
+
+
+# Funções auxiliares
+def format_project(project: dict, variants_by_url: Optional[Dict[str, list]] = None) -> dict:
+    """
+    Formata projeto para resposta da API. Com `variants_by_url` (URL da
+    imagem → versões responsivas) inclui `srcset` (WebP) e `sources`
+    (um srcset por formato, para <picture>).
+    """
+    variants = (variants_by_url or {}).get(project.get("image", ""), [])
+    formats = [f for f in ("avif", "webp") if any(v.get("format") == f for v in variants)]
+    
+    return {
+        "id": project.get("id"),
+        "title": project.get("title"),
+        "client": project.get("client"),
+        "year": project.get("year"),
+        "category": project.get("category"),
+        "description": project.get("description"),
+        "image": project.get("image", ""),
+        "srcset": build_srcset(variants, "webp"),
+        "sources": [
+            {"type": f"image/{fmt}", "srcset": build_srcset(variants, fmt)}
+            for fmt in formats
+        ],
+        "featured": project.get("featured", False),
+        "videoUrl": project.get("videoUrl", ""),
+        "date": project.get("date")
+    }
+
+
+def format_client(client: dict) -> dict:
+    """Formata cliente para resposta da API"""
+    return {
+        "id": client.get("id"),
+        "name": client.get("name"),
+        "logo": client.get("logo", ""),
+        "website": client.get("website", "")
+    }
+
+
+async def create_default_portfolio():
+    """Cria portfólio padrão se não existir"""
+    try:
+        portfolio_col = await get_portfolio_collection()
+        
+        default_portfolio = {
+            "personal": {
+                "name": "Jeferson Rodrigues",
+                "role": "Gaffer | Iluminação Audiovisual",
+                "location": "São Paulo & Rio de Janeiro",
+                "email": "jeferson@exemplo.com",
+                "phone": "+55 11 9999-9999",
+                "bio": "Profissional especializado em iluminação para produções audiovisuais com mais de 8 anos de experiência. Trabalho como Gaffer em grandes produções para Netflix, canais de TV e campanhas publicitárias.",
+                "heroImage": "",
+                "aboutImage": "",
+                "social": {
+                    "instagram": "@jefersonrodrigues",
+                    "linkedin": "jeferson-rodrigues",
+                    "youtube": "@jefersonrodrigues",
+                    "whatsapp": "5511999999999"
+                }
+            },
+            "demoReel": {
+                "title": "Demo Reel 2024",
+                "description": "Principais trabalhos em iluminação cinematográfica",
+                "videoUrl": "",
+                "thumbnail": ""
+            },
+            "services": [
+                {
+                    "title": "Gaffer",
+                    "description": "Direção de iluminação para cinema, TV e publicidade",
+                    "icon": "lightbulb"
+                },
+                {
+                    "title": "Direção de Fotografia",
+                    "description": "Conceito visual e estética cinematográfica",
+                    "icon": "camera"
+                },
+                {
+                    "title": "Consultoria Técnica",
+                    "description": "Planejamento de equipamentos e orçamentos",
+                    "icon": "settings"
+                },
+                {
+                    "title": "Color Grading",
+                    "description": "Finalização e correção de cor",
+                    "icon": "palette"
+                }
+            ]
+        }
+        
+        # Inserir no banco
+        await portfolio_col.insert_one(default_portfolio)
+        logger.info("Portfólio padrão criado")
+        
+        return default_portfolio
+        
+    except Exception as e:
+        logger.error(f"Erro ao criar portfólio padrão: {str(e)}")
+        return {}
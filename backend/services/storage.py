@@ -0,0 +1,772 @@
+import os
+import re
+import base64
+import time
+import shutil
+import asyncio
+import logging
+import functools
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from mimetypes import guess_type
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import cloudinary
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+import cloudinary.utils
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from utils.executor import BoundedExecutor, ExecutorSaturatedError
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 só é necessário com STORAGE_BACKEND=s3
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+# Backend de armazenamento: "local", "s3" ou "cloudinary". Vazio mantém o
+# comportamento anterior (Cloudinary se configurado, senão disco local)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "").strip().lower()
+
+# Disco local
+UPLOAD_ROOT = os.environ.get("UPLOAD_ROOT", "/app/uploads")
+
+# Configuração Cloudinary
+cloudinary.config(
+    cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME", ""),
+    api_key=os.environ.get("CLOUDINARY_API_KEY", ""),
+    api_secret=os.environ.get("CLOUDINARY_API_SECRET", "")
+)
+
+# Endpoint alternativo da API (ex.: servidor fake em testes locais)
+if os.environ.get("CLOUDINARY_UPLOAD_PREFIX"):
+    cloudinary.config(upload_prefix=os.environ["CLOUDINARY_UPLOAD_PREFIX"])
+
+# Chamadas do SDK do Cloudinary são síncronas: executadas em pool dedicado,
+# com limite de concorrência, fila e timeout
+CLOUDINARY_MAX_WORKERS = int(os.environ.get("CLOUDINARY_MAX_WORKERS", "4"))
+CLOUDINARY_MAX_QUEUE = int(os.environ.get("CLOUDINARY_MAX_QUEUE", "16"))
+CLOUDINARY_UPLOAD_TIMEOUT = float(os.environ.get("CLOUDINARY_UPLOAD_TIMEOUT", "300"))  # segundos
+CLOUDINARY_DESTROY_TIMEOUT = float(os.environ.get("CLOUDINARY_DESTROY_TIMEOUT", "30"))  # segundos
+# Vídeos acima deste tamanho são enviados em partes (upload_large)
+CLOUDINARY_LARGE_THRESHOLD = int(os.environ.get("CLOUDINARY_LARGE_THRESHOLD", str(20 * 1024 * 1024)))  # 20MB
+CLOUDINARY_CHUNK_SIZE = int(os.environ.get("CLOUDINARY_CHUNK_SIZE", str(6 * 1024 * 1024)))  # 6MB
+
+# S3 e compatíveis (MinIO, R2...): multipart em paralelo com conexões reaproveitadas
+S3_BUCKET = os.environ.get("S3_BUCKET", "")
+S3_REGION = os.environ.get("S3_REGION", "us-east-1")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL") or None
+S3_PUBLIC_URL = os.environ.get("S3_PUBLIC_URL", "").rstrip("/")  # CDN ou URL pública do bucket
+S3_PART_SIZE = int(os.environ.get("S3_PART_SIZE", str(8 * 1024 * 1024)))  # 8MB
+S3_MAX_CONCURRENCY = int(os.environ.get("S3_MAX_CONCURRENCY", "8"))  # partes simultâneas por arquivo
+S3_MAX_WORKERS = int(os.environ.get("S3_MAX_WORKERS", "4"))  # arquivos simultâneos
+S3_MAX_QUEUE = int(os.environ.get("S3_MAX_QUEUE", "16"))
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", str(S3_MAX_WORKERS * S3_MAX_CONCURRENCY)))
+S3_UPLOAD_TIMEOUT = float(os.environ.get("S3_UPLOAD_TIMEOUT", "600"))  # segundos
+S3_REQUEST_TIMEOUT = float(os.environ.get("S3_REQUEST_TIMEOUT", "30"))  # segundos
+S3_CACHE_CONTROL = os.environ.get("S3_CACHE_CONTROL", "public, max-age=31536000, immutable")
+
+
+def is_cloudinary_configured() -> bool:
+    """Verifica se Cloudinary está configurado"""
+    return all([
+        os.environ.get("CLOUDINARY_CLOUD_NAME"),
+        os.environ.get("CLOUDINARY_API_KEY"),
+        os.environ.get("CLOUDINARY_API_SECRET")
+    ])
+
+
+def normalize_key(key: str) -> Optional[str]:
+    """Chave relativa segura (sem "..", "." ou segmentos ocultos) ou None"""
+    parts = [p for p in key.replace("\\", "/").split("/") if p]
+    if not parts or any(p in ("..", ".") or p.startswith(".") for p in parts):
+        return None
+    return "/".join(parts)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Data ISO 8601 do Cloudinary ("2024-01-01T00:00:00Z")"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+@dataclass
+class StoredObject:
+    """Resultado de um envio ao armazenamento"""
+    key: str
+    url: str
+    size: int
+    content_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+@dataclass
+class ObjectStat:
+    """Metadados de um objeto armazenado"""
+    key: str
+    size: int
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    modified: Optional[datetime] = None
+    # SHA-256 (hex) verificado pelo próprio armazenamento, quando disponível
+    checksum_sha256: Optional[str] = None
+
+
+@dataclass
+class PresignedUpload:
+    """Envio direto do cliente ao armazenamento, sem passar pela API"""
+    key: str
+    method: str
+    url: str
+    fields: Dict[str, Any] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+async def run_blocking(executor: BoundedExecutor, provider: str, call, timeout: float) -> Any:
+    """
+    Executa chamada síncrona de SDK (sem argumentos; use functools.partial)
+    no pool do provedor. Pool saturado vira 503 e timeout vira 504.
+    """
+    try:
+        return await executor.run(call, timeout=timeout)
+    except ExecutorSaturatedError:
+        raise HTTPException(status_code=503, detail="Serviço de upload ocupado. Tente novamente em instantes.")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Tempo limite excedido no envio ao {provider}")
+
+
+class StorageBackend(ABC):
+    """
+    Interface dos backends de armazenamento de mídia. As chaves são
+    caminhos relativos ("pasta/arquivo.ext"); `url_for` dá a URL pública.
+    """
+
+    name = "base"
+    # Versões responsivas geradas pela aplicação (o Cloudinary transforma sob demanda)
+    local_derivatives = True
+    # Gera URL assinada para o cliente enviar direto (presign_upload)
+    supports_presign = False
+    # Permite ler o objeto armazenado (read_head/get_file)
+    supports_read = False
+
+    def __init__(self):
+        self.metrics = {"uploads": 0, "bytes": 0, "seconds": 0.0, "deletes": 0}
+
+    @abstractmethod
+    async def put_stream(self, key: str, stream: BinaryIO, size: int, content_type: str, **options) -> StoredObject:
+        """Grava o conteúdo lido de `stream` em `key`"""
+
+    async def put_file(self, key: str, path: str, size: int, content_type: str, **options) -> StoredObject:
+        """
+        Grava arquivo em disco. O arquivo de origem pode ser consumido
+        (movido) pelo backend; quem chama não deve reutilizá-lo.
+        """
+        stream = await run_in_threadpool(open, path, "rb")
+        try:
+            return await self.put_stream(key, stream, size, content_type, **options)
+        finally:
+            stream.close()
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Remove o objeto; retorna False se não existia"""
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove vários objetos; retorna quantos foram removidos"""
+        results = await asyncio.gather(*(self.delete(key) for key in keys))
+        return sum(results)
+
+    @abstractmethod
+    def list_objects(self, batch_size: int = 500, prefix: str = "") -> AsyncIterator[List[ObjectStat]]:
+        """
+        Lista os objetos cujo caminho começa com `prefix` (no Cloudinary,
+        o public_id) em lotes de até `batch_size`
+        """
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        """URL pública do objeto"""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[ObjectStat]:
+        """Metadados do objeto, ou None se não existir"""
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Chave correspondente a uma URL deste backend (None se não for dele)"""
+        return None
+
+    def _record_upload(self, size: int, started: float) -> None:
+        self.metrics["uploads"] += 1
+        self.metrics["bytes"] += size
+        self.metrics["seconds"] += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        seconds = self.metrics["seconds"]
+        return {
+            "uploads": self.metrics["uploads"],
+            "deletes": self.metrics["deletes"],
+            "bytes_uploaded": self.metrics["bytes"],
+            "throughput_mb_s": round(self.metrics["bytes"] / seconds / (1024 * 1024), 3) if seconds else 0.0
+        }
+
+    def close(self) -> None:
+        pass
+
+
+class LocalStorage(StorageBackend):
+    """Disco local em UPLOAD_ROOT, servido pela rota /uploads"""
+
+    name = "local"
+
+    def __init__(self, root: str = UPLOAD_ROOT):
+        super().__init__()
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        safe_key = normalize_key(key)
+        if safe_key is None:
+            raise ValueError(f"Chave inválida: {key}")
+        return os.path.join(self.root, safe_key)
+
+    async def put_stream(self, key: str, stream: BinaryIO, size: int, content_type: str, **options) -> StoredObject:
+        started = time.perf_counter()
+        path = self._path(key)
+
+        def write():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    shutil.copyfileobj(stream, out, 1024 * 1024)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+        await run_in_threadpool(write)
+        self._record_upload(size, started)
+        return StoredObject(key, self.url_for(key), size, content_type)
+
+    async def put_file(self, key: str, path: str, size: int, content_type: str, **options) -> StoredObject:
+        # Mesmo sistema de arquivos do staging: rename, sem copiar os dados
+        started = time.perf_counter()
+        target = self._path(key)
+
+        def move():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+
+        await run_in_threadpool(move)
+        self._record_upload(size, started)
+        return StoredObject(key, self.url_for(key), size, content_type)
+
+    async def delete(self, key: str) -> bool:
+        try:
+            await run_in_threadpool(os.remove, self._path(key))
+        except FileNotFoundError:
+            return False
+        self.metrics["deletes"] += 1
+        return True
+
+    def _walk(self, prefix: str = "") -> List[ObjectStat]:
+        # Ocultos (.staging) e temporários (.part) não são objetos; só a
+        # pasta do prefixo é percorrida
+        objects = []
+        top = os.path.join(self.root, *prefix.split("/")[:-1])
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if filename.startswith(".") or filename.endswith(".part"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    result = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                objects.append(ObjectStat(
+                    key=key,
+                    size=result.st_size,
+                    modified=datetime.fromtimestamp(result.st_mtime, tz=timezone.utc)
+                ))
+        return objects
+
+    async def list_objects(self, batch_size: int = 500, prefix: str = "") -> AsyncIterator[List[ObjectStat]]:
+        objects = await run_in_threadpool(self._walk, prefix)
+        for start in range(0, len(objects), batch_size):
+            yield objects[start:start + batch_size]
+
+    def url_for(self, key: str) -> str:
+        return f"/uploads/{key}"
+
+    async def stat(self, key: str) -> Optional[ObjectStat]:
+        try:
+            result = await run_in_threadpool(os.stat, self._path(key))
+        except FileNotFoundError:
+            return None
+        return ObjectStat(
+            key=key,
+            size=result.st_size,
+            content_type=guess_type(key)[0],
+            modified=datetime.fromtimestamp(result.st_mtime, tz=timezone.utc)
+        )
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if url.startswith("/uploads/"):
+            return normalize_key(url[len("/uploads/"):])
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"root": self.root, **super().stats()}
+
+
+class S3Storage(StorageBackend):
+    """
+    S3 e compatíveis (MinIO via S3_ENDPOINT_URL). Arquivos acima de
+    S3_PART_SIZE vão em multipart com até S3_MAX_CONCURRENCY partes em
+    paralelo; o cliente mantém um pool de S3_MAX_POOL_CONNECTIONS conexões.
+    """
+
+    name = "s3"
+    supports_presign = True
+    supports_read = True
+
+    def __init__(self):
+        super().__init__()
+        if boto3 is None:
+            raise RuntimeError("boto3 não instalado: necessário para STORAGE_BACKEND=s3")
+        if not S3_BUCKET:
+            raise RuntimeError("S3_BUCKET não configurado")
+
+        self.bucket = S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            region_name=S3_REGION,
+            endpoint_url=S3_ENDPOINT_URL,
+            aws_access_key_id=os.environ.get("S3_ACCESS_KEY_ID") or None,
+            aws_secret_access_key=os.environ.get("S3_SECRET_ACCESS_KEY") or None,
+            config=BotoConfig(
+                max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=S3_REQUEST_TIMEOUT,
+                read_timeout=S3_REQUEST_TIMEOUT,
+                retries={"max_attempts": 3, "mode": "standard"},
+                signature_version="s3v4",
+                # Endpoints próprios (MinIO) normalmente exigem path-style
+                s3={"addressing_style": "path" if S3_ENDPOINT_URL else "auto"}
+            )
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_PART_SIZE,
+            multipart_chunksize=S3_PART_SIZE,
+            max_concurrency=S3_MAX_CONCURRENCY,
+            use_threads=True
+        )
+        self.executor = BoundedExecutor("s3", S3_MAX_WORKERS, S3_MAX_QUEUE)
+
+        if S3_PUBLIC_URL:
+            self.base_url = S3_PUBLIC_URL
+        elif S3_ENDPOINT_URL:
+            self.base_url = f"{S3_ENDPOINT_URL.rstrip('/')}/{self.bucket}"
+        else:
+            self.base_url = f"https://{self.bucket}.s3.{S3_REGION}.amazonaws.com"
+
+    def _extra_args(self, content_type: str) -> Dict[str, str]:
+        return {"ContentType": content_type, "CacheControl": S3_CACHE_CONTROL}
+
+    async def put_stream(self, key: str, stream: BinaryIO, size: int, content_type: str, **options) -> StoredObject:
+        started = time.perf_counter()
+        await run_blocking(
+            self.executor, "S3",
+            functools.partial(
+                self.client.upload_fileobj, stream, self.bucket, key,
+                ExtraArgs=self._extra_args(content_type),
+                Config=self.transfer_config
+            ),
+            timeout=S3_UPLOAD_TIMEOUT
+        )
+        self._record_upload(size, started)
+        return StoredObject(key, self.url_for(key), size, content_type)
+
+    async def put_file(self, key: str, path: str, size: int, content_type: str, **options) -> StoredObject:
+        started = time.perf_counter()
+        await run_blocking(
+            self.executor, "S3",
+            functools.partial(
+                self.client.upload_file, path, self.bucket, key,
+                ExtraArgs=self._extra_args(content_type),
+                Config=self.transfer_config
+            ),
+            timeout=S3_UPLOAD_TIMEOUT
+        )
+        self._record_upload(size, started)
+        return StoredObject(key, self.url_for(key), size, content_type)
+
+    async def delete(self, key: str) -> bool:
+        if await self.stat(key) is None:
+            return False
+        await run_blocking(
+            self.executor, "S3",
+            functools.partial(self.client.delete_object, Bucket=self.bucket, Key=key),
+            timeout=S3_REQUEST_TIMEOUT
+        )
+        self.metrics["deletes"] += 1
+        return True
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        # DeleteObjects aceita até 1000 chaves por requisição
+        keys = list(keys)
+        deleted = 0
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            result = await run_blocking(
+                self.executor, "S3",
+                functools.partial(
+                    self.client.delete_objects,
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                ),
+                timeout=S3_REQUEST_TIMEOUT
+            )
+            errors = result.get("Errors", [])
+            for error in errors:
+                logger.warning(f"Erro ao remover {error.get('Key')} do S3: {error.get('Message')}")
+            deleted += len(batch) - len(errors)
+        self.metrics["deletes"] += deleted
+        return deleted
+
+    async def list_objects(self, batch_size: int = 500, prefix: str = "") -> AsyncIterator[List[ObjectStat]]:
+        token = None
+        while True:
+            params = {"Bucket": self.bucket, "Prefix": prefix, "MaxKeys": min(batch_size, 1000)}
+            if token:
+                params["ContinuationToken"] = token
+            page = await run_blocking(
+                self.executor, "S3",
+                functools.partial(self.client.list_objects_v2, **params),
+                timeout=S3_REQUEST_TIMEOUT
+            )
+            objects = [
+                ObjectStat(key=item["Key"], size=item["Size"], etag=item.get("ETag"), modified=item.get("LastModified"))
+                for item in page.get("Contents", [])
+            ]
+            if objects:
+                yield objects
+            if not page.get("IsTruncated"):
+                break
+            token = page["NextContinuationToken"]
+
+    def url_for(self, key: str) -> str:
+        return f"{self.base_url}/{quote(key)}"
+
+    async def stat(self, key: str) -> Optional[ObjectStat]:
+        try:
+            head = await run_blocking(
+                self.executor, "S3",
+                functools.partial(self.client.head_object, Bucket=self.bucket, Key=key, ChecksumMode="ENABLED"),
+                timeout=S3_REQUEST_TIMEOUT
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+        # Checksums compostos ("...-N") de multipart não são o SHA-256 do arquivo
+        checksum = head.get("ChecksumSHA256")
+        if checksum and "-" not in checksum:
+            checksum = base64.b64decode(checksum).hex()
+        else:
+            checksum = None
+
+        return ObjectStat(
+            key=key,
+            size=head["ContentLength"],
+            content_type=head.get("ContentType"),
+            etag=head.get("ETag"),
+            modified=head.get("LastModified"),
+            checksum_sha256=checksum
+        )
+
+    def presign_upload(self, key: str, content_type: str, size: int, sha256: str, expires_in: int, **options) -> PresignedUpload:
+        """URL assinada para o cliente enviar o arquivo direto"""
+        # PUT assinado com tamanho, tipo e SHA-256: o S3 recusa conteúdo diferente
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "ChecksumSHA256": checksum,
+                "CacheControl": S3_CACHE_CONTROL
+            },
+            ExpiresIn=expires_in
+        )
+        return PresignedUpload(
+            key=key,
+            method="PUT",
+            url=url,
+            headers={
+                "Content-Type": content_type,
+                "Cache-Control": S3_CACHE_CONTROL,
+                "x-amz-checksum-sha256": checksum
+            }
+        )
+
+    async def read_head(self, key: str, length: int = 64) -> bytes:
+        """Primeiros bytes do objeto (identificação do tipo real)"""
+        result = await run_blocking(
+            self.executor, "S3",
+            functools.partial(self.client.get_object, Bucket=self.bucket, Key=key, Range=f"bytes=0-{length - 1}"),
+            timeout=S3_REQUEST_TIMEOUT
+        )
+        with result["Body"] as body:
+            return await run_in_threadpool(body.read)
+
+    async def get_file(self, key: str, path: str) -> None:
+        """Copia o objeto para um arquivo local"""
+        await run_blocking(
+            self.executor, "S3",
+            functools.partial(self.client.download_file, self.bucket, key, path, Config=self.transfer_config),
+            timeout=S3_UPLOAD_TIMEOUT
+        )
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if url.startswith(f"{self.base_url}/"):
+            return normalize_key(unquote(url[len(self.base_url) + 1:]))
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"bucket": self.bucket, **super().stats(), **self.executor.stats()}
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+    Cloudinary. A chave é "<resource_type>/<public_id>"; imagens e vídeos
+    recebem transformações do próprio Cloudinary.
+    """
+
+    name = "cloudinary"
+    local_derivatives = False
+
+    _UPLOAD_PATH = re.compile(r"/(image|video|raw)/upload/(?:v\d+/)?(.+?)(?:\.[A-Za-z0-9]+)?$")
+
+    def __init__(self):
+        super().__init__()
+        self.metrics["chunked_uploads"] = 0
+        self.executor = BoundedExecutor("cloudinary", CLOUDINARY_MAX_WORKERS, CLOUDINARY_MAX_QUEUE)
+
+    async def _call(self, fn, *args, timeout: float, **options) -> Any:
+        # O `timeout` também vai ao SDK, para que a thread não fique presa
+        # numa conexão travada
+        return await run_blocking(
+            self.executor, "Cloudinary",
+            functools.partial(fn, *args, timeout=timeout, **options),
+            timeout
+        )
+
+    async def _upload(self, source, key: str, size: int, content_type: str, **options) -> StoredObject:
+        resource_type = options.pop("resource_type", "image")
+        public_id = os.path.splitext(key)[0]
+        # Vídeos grandes vão em partes
+        chunked = resource_type == "video" and size > CLOUDINARY_LARGE_THRESHOLD
+        started = time.perf_counter()
+
+        if chunked:
+            result = await self._call(
+                cloudinary.uploader.upload_large, source,
+                timeout=CLOUDINARY_UPLOAD_TIMEOUT,
+                chunk_size=CLOUDINARY_CHUNK_SIZE,
+                public_id=public_id, overwrite=True, resource_type=resource_type, **options
+            )
+        else:
+            result = await self._call(
+                cloudinary.uploader.upload, source,
+                timeout=CLOUDINARY_UPLOAD_TIMEOUT,
+                public_id=public_id, overwrite=True, resource_type=resource_type, **options
+            )
+
+        self._record_upload(size, started)
+        self.metrics["chunked_uploads"] += int(chunked)
+        logger.info(f"Upload de {resource_type} no Cloudinary: {result.get('public_id')}")
+
+        return StoredObject(
+            key=f"{resource_type}/{result.get('public_id', public_id)}",
+            url=result["secure_url"],
+            size=size,
+            content_type=content_type,
+            width=result.get("width"),
+            height=result.get("height")
+        )
+
+    async def put_stream(self, key: str, stream: BinaryIO, size: int, content_type: str, **options) -> StoredObject:
+        return await self._upload(stream, key, size, content_type, **options)
+
+    async def put_file(self, key: str, path: str, size: int, content_type: str, **options) -> StoredObject:
+        return await self._upload(path, key, size, content_type, **options)
+
+    def _split(self, key: str) -> Tuple[str, str]:
+        resource_type, _, public_id = key.partition("/")
+        return resource_type, public_id
+
+    async def delete(self, key: str) -> bool:
+        resource_type, public_id = self._split(key)
+        result = await self._call(
+            cloudinary.uploader.destroy, public_id,
+            timeout=CLOUDINARY_DESTROY_TIMEOUT,
+            resource_type=resource_type
+        )
+        deleted = result.get("result") == "ok"
+        self.metrics["deletes"] += int(deleted)
+        return deleted
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        # delete_resources aceita até 100 public_ids do mesmo resource_type
+        by_type: Dict[str, List[str]] = {}
+        for key in keys:
+            resource_type, public_id = self._split(key)
+            by_type.setdefault(resource_type, []).append(public_id)
+
+        deleted = 0
+        for resource_type, public_ids in by_type.items():
+            for start in range(0, len(public_ids), 100):
+                result = await self._call(
+                    cloudinary.api.delete_resources, public_ids[start:start + 100],
+                    timeout=CLOUDINARY_DESTROY_TIMEOUT,
+                    resource_type=resource_type
+                )
+                deleted += sum(1 for status in result.get("deleted", {}).values() if status == "deleted")
+        self.metrics["deletes"] += deleted
+        return deleted
+
+    async def list_objects(self, batch_size: int = 500, prefix: str = "") -> AsyncIterator[List[ObjectStat]]:
+        for resource_type in ("image", "video", "raw"):
+            cursor = None
+            while True:
+                options = {"type": "upload", "resource_type": resource_type, "max_results": min(batch_size, 500)}
+                if prefix:
+                    options["prefix"] = prefix
+                if cursor:
+                    options["next_cursor"] = cursor
+                page = await self._call(cloudinary.api.resources, timeout=CLOUDINARY_DESTROY_TIMEOUT, **options)
+                objects = [
+                    ObjectStat(
+                        key=f"{resource_type}/{resource['public_id']}",
+                        size=resource.get("bytes", 0),
+                        modified=_parse_timestamp(resource.get("created_at"))
+                    )
+                    for resource in page.get("resources", [])
+                ]
+                if objects:
+                    yield objects
+                cursor = page.get("next_cursor")
+                if not cursor:
+                    break
+
+    def url_for(self, key: str) -> str:
+        resource_type, public_id = self._split(key)
+        return cloudinary.utils.cloudinary_url(public_id, resource_type=resource_type, secure=True)[0]
+
+    async def stat(self, key: str) -> Optional[ObjectStat]:
+        resource_type, public_id = self._split(key)
+        try:
+            resource = await self._call(
+                cloudinary.api.resource, public_id,
+                timeout=CLOUDINARY_DESTROY_TIMEOUT,
+                resource_type=resource_type
+            )
+        except cloudinary.exceptions.NotFound:
+            return None
+        return ObjectStat(
+            key=key,
+            size=resource.get("bytes", 0),
+            content_type=f"{resource_type}/{resource.get('format', '')}".rstrip("/"),
+            etag=resource.get("etag"),
+            modified=_parse_timestamp(resource.get("created_at"))
+        )
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if "cloudinary" not in url:
+            return None
+        match = self._UPLOAD_PATH.search(url)
+        return f"{match.group(1)}/{match.group(2)}" if match else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "chunked_uploads": self.metrics["chunked_uploads"],
+            **self.executor.stats()
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+
+STORAGE_BACKENDS = {
+    "local": LocalStorage,
+    "s3": S3Storage,
+    "cloudinary": CloudinaryStorage
+}
+
+_instances: Dict[str, StorageBackend] = {}
+
+
+def default_backend_name() -> str:
+    if STORAGE_BACKEND:
+        return STORAGE_BACKEND
+    return "cloudinary" if is_cloudinary_configured() else "local"
+
+
+def get_storage(name: Optional[str] = None) -> StorageBackend:
+    """Backend configurado (ou o informado), criado uma vez por processo"""
+    name = name or default_backend_name()
+    if name not in _instances:
+        if name not in STORAGE_BACKENDS:
+            raise ValueError(f"Backend de armazenamento desconhecido: {name}")
+        _instances[name] = STORAGE_BACKENDS[name]()
+        logger.info(f"Backend de armazenamento iniciado: {name}")
+    return _instances[name]
+
+
+def resolve_url(url: str) -> Optional[Tuple[StorageBackend, str]]:
+    """Backend e chave de uma URL de mídia (inclusive de backends anteriores)"""
+    names = ["local", "cloudinary"]
+    if S3_BUCKET and boto3 is not None:
+        names.append("s3")
+
+    for name in names:
+        storage = get_storage(name)
+        key = storage.key_for_url(url)
+        if key:
+            return storage, key
+    return None
+
+
+def storage_stats() -> Dict[str, Any]:
+    """Métricas dos backends em uso"""
+    return {
+        "backend": default_backend_name(),
+        **{name: storage.stats() for name, storage in _instances.items()}
+    }
+
+
+def shutdown_storage() -> None:
+    for storage in _instances.values():
+        storage.close()
@@ -1,20 +1,23 @@
 import os
-import cloudinary
-import cloudinary.uploader
-from typing import Optional
+import shutil
+import asyncio
+import hashlib
+import tempfile
+from typing import Any, Dict, List, Optional
 import logging
 from fastapi import HTTPException, UploadFile
-import uuid
+from starlette.concurrency import run_in_threadpool
+from services.media import (
+    acquire_media, register_media, release_media,
+    begin_media_deletion, finish_media_deletion, read_image_dimensions
+)
+from services.images import create_variants
+from services.storage import (
+    UPLOAD_ROOT, default_backend_name, get_storage, is_cloudinary_configured, resolve_url
+)
 
 logger = logging.getLogger(__name__)
 
-# Configuração Cloudinary
-cloudinary.config(
-    cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME", ""),
-    api_key=os.environ.get("CLOUDINARY_API_KEY", ""),
-    api_secret=os.environ.get("CLOUDINARY_API_SECRET", "")
-)
-
 # Tipos de arquivo permitidos
 ALLOWED_IMAGE_TYPES = {
     "image/jpeg", "image/jpg", "image/png", "image/webp", "image/gif"
@@ -26,17 +29,239 @@ ALLOWED_VIDEO_TYPES = {
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
-def is_cloudinary_configured() -> bool:
-    """Verifica se Cloudinary está configurado"""
-    return all([
-        os.environ.get("CLOUDINARY_CLOUD_NAME"),
-        os.environ.get("CLOUDINARY_API_KEY"),
-        os.environ.get("CLOUDINARY_API_SECRET")
-    ])
+# Área temporária e leitura em blocos
+UPLOAD_STAGING_DIR = os.path.join(UPLOAD_ROOT, ".staging")
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1MB
+HASH_READ_SIZE = 1024 * 1024
+
+# Upload múltiplo: arquivos processados em paralelo, com timeout por arquivo
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", "3"))
+UPLOAD_FILE_TIMEOUT = float(os.environ.get("UPLOAD_FILE_TIMEOUT", "120"))  # segundos
+
+# Assinaturas (magic bytes) para identificar o conteúdo real do arquivo
+FILE_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (4, b"ftyp", "video/mp4"),
+    (0, b"FLV", "video/flv"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", "video/wmv"),
+]
+
+# Extensão gravada para cada tipo identificado (nunca a do nome enviado)
+FILE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "video/mp4": "mp4",
+    "video/avi": "avi",
+    "video/flv": "flv",
+    "video/wmv": "wmv",
+}
+
+# Tipos informados pelo cliente que equivalem a um tipo identificável
+CONTENT_TYPE_ALIASES = {
+    "image/jpg": "image/jpeg",
+    "video/mov": "video/mp4",  # QuickTime usa a mesma caixa "ftyp"
+}
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Identifica o tipo do arquivo pelos primeiros bytes"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video/avi"
+    for offset, signature, content_type in FILE_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    return None
+
+def canonical_content_type(content_type: Optional[str]) -> Optional[str]:
+    """Tipo informado pelo cliente no formato retornado por sniff_content_type"""
+    return CONTENT_TYPE_ALIASES.get(content_type, content_type)
+
+def extension_for(content_type: Optional[str]) -> str:
+    """Extensão do arquivo armazenado a partir do tipo identificado"""
+    return FILE_EXTENSIONS.get(canonical_content_type(content_type), "")
+
+def content_key(folder: str, sha256: str, content_type: Optional[str]) -> str:
+    """Chave endereçada por conteúdo: {pasta}/{sha256}.{extensão do tipo real}"""
+    extension = extension_for(content_type)
+    return f"{folder}/{sha256}.{extension}" if extension else f"{folder}/{sha256}"
+
+def hash_file(path: str) -> Dict[str, Any]:
+    """SHA-256 e primeiros bytes de um arquivo em disco (leitura sequencial em blocos)"""
+    hasher = hashlib.sha256()
+    head = b""
+    with open(path, "rb") as file:
+        while True:
+            block = file.read(HASH_READ_SIZE)
+            if not block:
+                break
+            if not head:
+                head = block[:64]
+            hasher.update(block)
+    return {"sha256": hasher.hexdigest(), "head": head}
+
+def safe_folder(folder: str) -> str:
+    """Normaliza a pasta de destino, impedindo sair da raiz de uploads"""
+    parts = [p for p in folder.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or any(p == ".." for p in parts):
+        raise HTTPException(status_code=400, detail="Pasta inválida")
+    return "/".join(parts)
+
+class StagedUpload:
+    """Arquivo recebido em blocos e gravado em área temporária"""
+
+    def __init__(self, path: str, size: int, sha256: str, content_type: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+    def discard(self) -> None:
+        """Remove o arquivo temporário (se ainda existir)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+async def stage_upload(file: UploadFile, category: str, max_size: int = MAX_FILE_SIZE) -> StagedUpload:
+    """
+    Lê o upload em blocos de UPLOAD_CHUNK_SIZE gravando direto em disco,
+    calculando SHA-256 e identificando o tipo real no primeiro bloco.
+    Aborta assim que o tamanho ultrapassa `max_size`; a memória usada é
+    constante independente do tamanho do arquivo.
+    """
+    # Tamanho já conhecido pelo parser multipart: rejeitar sem ler
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=400, detail="Arquivo muito grande (máx 50MB)")
+    
+    os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=UPLOAD_STAGING_DIR, suffix=".part")
+    
+    hasher = hashlib.sha256()
+    size = 0
+    sniffed = None
+    
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                if size == 0:
+                    sniffed = sniff_content_type(chunk[:64])
+                    if sniffed is None or not sniffed.startswith(f"{category}/"):
+                        raise HTTPException(
+                            status_code=400,
+                            detail="Conteúdo do arquivo não corresponde ao tipo informado"
+                        )
+                
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=400, detail="Arquivo muito grande (máx 50MB)")
+                
+                hasher.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+        
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Arquivo vazio")
+        
+    except BaseException:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        raise
+    
+    return StagedUpload(path, size, hasher.hexdigest(), sniffed)
+
+async def store_variants(storage, source_path: str, folder: str, base_name: str) -> List[Dict[str, Any]]:
+    """
+    Gera as versões responsivas (WebP/AVIF) no pool de processos, numa
+    pasta temporária, e as envia ao armazenamento em paralelo
+    """
+    variants_dir = await run_in_threadpool(tempfile.mkdtemp, dir=UPLOAD_STAGING_DIR)
+    try:
+        variants = await create_variants(source_path, variants_dir, base_name)
+        stored_variants = await asyncio.gather(*(
+            storage.put_file(
+                f"{folder}/{variant['filename']}",
+                os.path.join(variants_dir, variant["filename"]),
+                variant["size"],
+                variant["contentType"]
+            )
+            for variant in variants
+        ))
+    finally:
+        await run_in_threadpool(shutil.rmtree, variants_dir, True)
+    
+    for variant, stored_variant in zip(variants, stored_variants):
+        del variant["filename"]
+        variant["key"] = stored_variant.key
+        variant["url"] = stored_variant.url
+    return variants
+
+async def store_upload(
+    staged: StagedUpload,
+    folder: str,
+    resource_type: str,
+    **cloudinary_options
+) -> Dict[str, Any]:
+    """
+    Armazena o arquivo endereçado pelo SHA-256 do conteúdo no backend de
+    armazenamento configurado e o registra na collection de mídia.
+    Conteúdo já conhecido retorna o registro existente sem novo envio.
+    """
+    storage = get_storage()
+    width = height = None
+    variants = []
+    
+    try:
+        existing = await acquire_media(staged.sha256)
+        if existing:
+            logger.info(f"Mídia reaproveitada ({resource_type}): {existing['url']}")
+            return existing
+        
+        if resource_type == "image" and storage.local_derivatives:
+            width, height = await run_in_threadpool(read_image_dimensions, staged.path)
+            # Antes do envio: o backend pode mover o arquivo original
+            variants = await store_variants(storage, staged.path, folder, staged.sha256)
+        
+        stored = await storage.put_file(
+            content_key(folder, staged.sha256, staged.content_type),
+            staged.path,
+            staged.size,
+            staged.content_type,
+            resource_type=resource_type,
+            **cloudinary_options
+        )
+        width = width or stored.width
+        height = height or stored.height
+    finally:
+        staged.discard()
+    
+    media = await register_media(
+        staged.sha256,
+        stored.url,
+        resource_type,
+        staged.content_type,
+        staged.size,
+        width=width,
+        height=height,
+        backend=storage.name,
+        key=stored.key,
+        variants=variants
+    )
+    return media
 
-async def upload_image(file: UploadFile, folder: str = "gaffer-portfolio") -> str:
+async def upload_image(file: UploadFile, folder: str = "gaffer-portfolio") -> Dict[str, Any]:
     """
-    Upload de imagem para Cloudinary
+    Upload de imagem para o armazenamento configurado (retorna o registro da mídia)
     """
     try:
         # Validações
@@ -46,40 +271,29 @@ async def upload_image(file: UploadFile, folder: str = "gaffer-portfolio") -> st
                 detail="Tipo de arquivo não permitido. Use: JPG, PNG, WebP, GIF"
             )
         
-        # Verificar tamanho do arquivo
-        contents = await file.read()
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="Arquivo muito grande (máx 50MB)")
-        
-        # Reset file pointer
-        await file.seek(0)
+        folder = safe_folder(folder)
         
-        if not is_cloudinary_configured():
-            # Fallback: salvar localmente se Cloudinary não configurado
-            return await save_file_locally(file, folder)
+        # Leitura em blocos com limite de tamanho
+        staged = await stage_upload(file, "image")
         
-        # Upload para Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            contents,
-            folder=folder,
-            public_id=f"{folder}_{uuid.uuid4()}",
-            overwrite=True,
-            resource_type="image",
+        return await store_upload(
+            staged,
+            folder,
+            "image",
             format="webp",  # Converter para WebP para otimização
             quality="auto:good",
             fetch_format="auto"
         )
         
-        logger.info(f"Imagem uploaded: {upload_result['public_id']}")
-        return upload_result["secure_url"]
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro no upload da imagem: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro no upload da imagem")
 
-async def upload_video(file: UploadFile, folder: str = "gaffer-portfolio/videos") -> str:
+async def upload_video(file: UploadFile, folder: str = "gaffer-portfolio/videos") -> Dict[str, Any]:
     """
-    Upload de vídeo para Cloudinary
+    Upload de vídeo para o armazenamento configurado (retorna o registro da mídia)
     """
     try:
         # Validações
@@ -89,75 +303,59 @@ async def upload_video(file: UploadFile, folder: str = "gaffer-portfolio/videos"
                 detail="Tipo de arquivo não permitido. Use: MP4, AVI, MOV, WMV"
             )
         
-        contents = await file.read()
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="Arquivo muito grande (máx 50MB)")
-        
-        await file.seek(0)
+        folder = safe_folder(folder)
         
-        if not is_cloudinary_configured():
-            return await save_file_locally(file, folder)
+        staged = await stage_upload(file, "video")
         
-        # Upload para Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            contents,
-            folder=folder,
-            public_id=f"{folder}_{uuid.uuid4()}",
-            overwrite=True,
-            resource_type="video"
-        )
-        
-        logger.info(f"Vídeo uploaded: {upload_result['public_id']}")
-        return upload_result["secure_url"]
+        return await store_upload(staged, folder, "video")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro no upload do vídeo: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro no upload do vídeo")
 
-async def save_file_locally(file: UploadFile, folder: str) -> str:
-    """
-    Fallback: salvar arquivo localmente quando Cloudinary não está configurado
-    """
-    try:
-        # Criar diretório se não existir
-        upload_dir = f"/app/uploads/{folder}"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Nome único para o arquivo
-        file_extension = file.filename.split(".")[-1] if "." in file.filename else ""
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # Salvar arquivo
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        # Retornar URL local
-        return f"/uploads/{folder}/{unique_filename}"
-        
-    except Exception as e:
-        logger.error(f"Erro ao salvar arquivo localmente: {str(e)}")
-        raise HTTPException(status_code=500, detail="Erro ao salvar arquivo")
-
 async def delete_file(url: str) -> bool:
     """
-    Deleta arquivo do Cloudinary ou local
+    Deleta arquivo (e versões responsivas) do backend de armazenamento
     """
     try:
-        if "cloudinary" in url:
-            # Extrair public_id da URL do Cloudinary
-            public_id = url.split("/")[-1].split(".")[0]
-            result = cloudinary.uploader.destroy(public_id)
-            return result.get("result") == "ok"
+        # Mídia registrada: o arquivo só sai do storage na última referência.
+        # O registro fica marcado em remoção até os arquivos saírem, para
+        # que um upload simultâneo do mesmo conteúdo não seja apagado junto
+        media = await release_media(url)
+        deletion_id = None
+        if media is not None:
+            if media["refCount"] > 0:
+                logger.info(f"Referência à mídia liberada ({media['refCount']} restantes): {url}")
+                return True
+            deletion_id = await begin_media_deletion(media["hash"])
+            if deletion_id is None:
+                logger.info(f"Mídia voltou a ser referenciada durante a remoção: {url}")
+                return True
+        
+        if media and media.get("key"):
+            storage = get_storage(media["backend"])
+            keys = [media["key"]] + [v["key"] for v in media.get("variants", []) if v.get("key")]
         else:
-            # Arquivo local
-            if url.startswith("/uploads/"):
-                file_path = f"/app{url}"
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    return True
-        return False
+            # Mídia anterior ao registro por chave: deduzir backend e chave da URL
+            resolved = resolve_url(url)
+            if resolved is None:
+                return False
+            storage, key = resolved
+            if media and media.get("publicId") and storage.name == "cloudinary":
+                key = f"{media['resourceType']}/{media['publicId']}"
+            keys = [key]
+            for variant in (media or {}).get("variants", []):
+                variant_key = storage.key_for_url(variant["url"])
+                if variant_key:
+                    keys.append(variant_key)
+        
+        # Versões responsivas saem junto com a original
+        results = await asyncio.gather(*(storage.delete(key) for key in keys))
+        if deletion_id:
+            await finish_media_deletion(media["hash"], deletion_id)
+        return results[0]
         
     except Exception as e:
         logger.error(f"Erro ao deletar arquivo: {str(e)}")
@@ -169,7 +367,8 @@ def get_upload_config():
     """
     return {
         "cloudinary_configured": is_cloudinary_configured(),
+        "storage_backend": default_backend_name(),
         "max_file_size_mb": MAX_FILE_SIZE // (1024 * 1024),
-        "allowed_image_types": list(ALLOWED_IMAGE_TYPES),
-        "allowed_video_types": list(ALLOWED_VIDEO_TYPES)
+        "allowed_image_types": sorted(ALLOWED_IMAGE_TYPES),
+        "allowed_video_types": sorted(ALLOWED_VIDEO_TYPES)
     }
\ No newline at end of file
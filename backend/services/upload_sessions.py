@@ -0,0 +1,459 @@
+import os
+import math
+import shutil
+import time
+import uuid
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from starlette.concurrency import run_in_threadpool
+
+from models.upload import UploadSession, UploadSessionCreate
+from utils.database import get_upload_sessions_collection
+from services.upload import (
+    ALLOWED_IMAGE_TYPES, ALLOWED_VIDEO_TYPES, MAX_FILE_SIZE, UPLOAD_STAGING_DIR, UPLOAD_CHUNK_SIZE,
+    StagedUpload, hash_file, safe_folder, sniff_content_type, store_upload
+)
+
+logger = logging.getLogger(__name__)
+
+# Configurações do upload retomável (vídeos grandes em blocos)
+RESUMABLE_MAX_SIZE = int(os.environ.get("RESUMABLE_MAX_SIZE", str(4 * 1024 * 1024 * 1024)))  # 4GB
+RESUMABLE_CHUNK_SIZE = int(os.environ.get("RESUMABLE_CHUNK_SIZE", str(8 * 1024 * 1024)))  # 8MB
+RESUMABLE_MIN_CHUNK_SIZE = 256 * 1024
+RESUMABLE_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+UPLOAD_SESSION_TTL = float(os.environ.get("UPLOAD_SESSION_TTL", "86400"))  # segundos sem atividade
+UPLOAD_SESSION_GC_INTERVAL = float(os.environ.get("UPLOAD_SESSION_GC_INTERVAL", "900"))  # segundos
+UPLOAD_CHUNK_LEASE = float(os.environ.get("UPLOAD_CHUNK_LEASE", "600"))  # prazo para receber um bloco (segundos)
+UPLOAD_CHUNK_LEASE_MARGIN = 30  # folga da reserva no banco sobre o prazo local (segundos)
+UPLOAD_COMPLETE_LEASE = float(os.environ.get("UPLOAD_COMPLETE_LEASE", "1800"))  # prazo da finalização antes de outra tentativa assumir (segundos)
+
+# Status de uma sessão
+OPEN = "open"
+COMPLETING = "completing"
+COMPLETED = "completed"
+
+
+def session_path(session_id: str) -> str:
+    """Arquivo de staging da sessão (blocos gravados direto na posição final)"""
+    return os.path.join(UPLOAD_STAGING_DIR, f"session-{session_id}.part")
+
+
+def _expires_at() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _allocate(path: str, size: int) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def chunk_length(session: Dict[str, Any], index: int) -> int:
+    """Tamanho esperado do bloco `index` (o último pode ser menor)"""
+    start = index * session["chunkSize"]
+    return min(session["chunkSize"], session["size"] - start)
+
+
+def session_status(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Estado da sessão para o cliente retomar o envio"""
+    received = set(session.get("receivedChunks", []))
+    missing = [i for i in range(session["totalChunks"]) if i not in received]
+
+    # Bytes contíguos já recebidos a partir do início
+    offset = session["size"] if not missing else missing[0] * session["chunkSize"]
+
+    return {
+        "id": session["id"],
+        "status": session["status"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "chunkSize": session["chunkSize"],
+        "totalChunks": session["totalChunks"],
+        "receivedChunks": len(received),
+        "missingChunks": missing,
+        "offset": offset,
+        "url": session.get("url"),
+        "expiresAt": session["expiresAt"]
+    }
+
+
+async def create_session(data: UploadSessionCreate) -> Dict[str, Any]:
+    """Cria a sessão e pré-aloca o arquivo de staging com o tamanho final"""
+    if data.contentType in ALLOWED_VIDEO_TYPES:
+        kind, max_size = "video", RESUMABLE_MAX_SIZE
+    elif data.contentType in ALLOWED_IMAGE_TYPES:
+        kind, max_size = "image", MAX_FILE_SIZE
+    else:
+        raise HTTPException(status_code=400, detail="Tipo de arquivo não permitido")
+
+    if data.size > max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Arquivo muito grande (máx {max_size // (1024 * 1024)}MB)"
+        )
+
+    chunk_size = min(RESUMABLE_MAX_CHUNK_SIZE, max(RESUMABLE_MIN_CHUNK_SIZE, data.chunkSize or RESUMABLE_CHUNK_SIZE))
+
+    session = UploadSession(
+        filename=data.filename,
+        folder=safe_folder(data.folder),
+        kind=kind,
+        contentType=data.contentType,
+        size=data.size,
+        chunkSize=chunk_size,
+        totalChunks=math.ceil(data.size / chunk_size),
+        sha256=data.sha256.lower() if data.sha256 else None,
+        expiresAt=_expires_at()
+    )
+
+    os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+    await run_in_threadpool(_allocate, session_path(session.id), session.size)
+
+    sessions_col = await get_upload_sessions_collection()
+    try:
+        await sessions_col.insert_one(session.dict())
+    except Exception:
+        _remove(session_path(session.id))
+        raise
+
+    logger.info(f"Sessão de upload criada: {session.id} ({session.size} bytes, {session.totalChunks} blocos)")
+    return session.dict()
+
+
+async def get_session(session_id: str) -> Dict[str, Any]:
+    sessions_col = await get_upload_sessions_collection()
+    session = await sessions_col.find_one({"id": session_id}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Sessão de upload não encontrada")
+    return session
+
+
+async def write_chunk(
+    session_id: str,
+    index: int,
+    body: AsyncIterator[bytes],
+    checksum: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Grava o bloco `index` direto na sua posição do arquivo (pwrite), sem
+    acumular o corpo em memória. Blocos podem chegar em qualquer ordem e
+    em paralelo. O bloco é reservado antes da gravação: um bloco já
+    recebido não é regravado (retorna o estado atual) e a finalização só
+    começa com todos os blocos recebidos, sem gravação em andamento.
+    """
+    session = await get_session(session_id)
+    if index < 0 or index >= session["totalChunks"]:
+        raise HTTPException(status_code=400, detail="Índice de bloco inválido")
+
+    sessions_col = await get_upload_sessions_collection()
+    lease = f"chunkLeases.{index}"
+    token = str(uuid.uuid4())
+    now = datetime.utcnow()
+
+    # Reserva atômica: sessão aberta, bloco ainda não recebido e sem outra
+    # gravação ativa (reservas vencidas podem ser retomadas)
+    claimed = await sessions_col.find_one_and_update(
+        {
+            "id": session_id,
+            "status": OPEN,
+            "receivedChunks": {"$ne": index},
+            "$or": [{lease: {"$exists": False}}, {f"{lease}.until": {"$lt": now}}]
+        },
+        {"$set": {lease: {
+            "token": token,
+            "until": now + timedelta(seconds=UPLOAD_CHUNK_LEASE + UPLOAD_CHUNK_LEASE_MARGIN)
+        }}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not claimed:
+        session = await get_session(session_id)
+        if index in session.get("receivedChunks", []):
+            return session_status(session)
+        if session["status"] != OPEN:
+            raise HTTPException(status_code=409, detail="Sessão de upload não está aberta")
+        raise HTTPException(status_code=409, detail="Bloco já está sendo enviado")
+
+    try:
+        await _receive_chunk(claimed, index, body, checksum)
+    except BaseException:
+        await sessions_col.update_one(
+            {"id": session_id, f"{lease}.token": token},
+            {"$unset": {lease: ""}}
+        )
+        raise
+
+    session = await sessions_col.find_one_and_update(
+        {"id": session_id, "status": OPEN, f"{lease}.token": token},
+        {
+            "$addToSet": {"receivedChunks": index},
+            "$unset": {lease: ""},
+            "$set": {"updatedAt": datetime.utcnow(), "expiresAt": _expires_at()}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    if not session:
+        raise HTTPException(status_code=409, detail="Reserva do bloco expirou; reenvie o bloco")
+
+    return session_status(session)
+
+
+async def _receive_chunk(
+    session: Dict[str, Any],
+    index: int,
+    body: AsyncIterator[bytes],
+    checksum: Optional[str]
+) -> None:
+    """Grava o corpo do bloco reservado; nenhuma escrita após o prazo da reserva"""
+    expected = chunk_length(session, index)
+    offset = index * session["chunkSize"]
+    deadline = time.monotonic() + UPLOAD_CHUNK_LEASE
+    hasher = hashlib.sha256()
+    received = 0
+    buffer = bytearray()
+
+    async def flush() -> None:
+        if time.monotonic() > deadline:
+            raise HTTPException(status_code=408, detail="Tempo para envio do bloco esgotado")
+        await run_in_threadpool(os.pwrite, fd, bytes(buffer), offset + received - len(buffer))
+        buffer.clear()
+
+    # Pedaços do corpo agrupados até UPLOAD_CHUNK_SIZE antes de cada pwrite
+    fd = os.open(session_path(session["id"]), os.O_WRONLY)
+    try:
+        async for piece in body:
+            if not piece:
+                continue
+            received += len(piece)
+            if received > expected:
+                raise HTTPException(status_code=400, detail="Bloco maior que o esperado")
+            hasher.update(piece)
+            buffer += piece
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await flush()
+        if buffer:
+            await flush()
+    finally:
+        os.close(fd)
+
+    if received != expected:
+        raise HTTPException(status_code=400, detail=f"Tamanho do bloco incorreto (esperado {expected} bytes)")
+
+    if checksum and hasher.hexdigest() != checksum.strip().lower():
+        raise HTTPException(status_code=400, detail="Checksum do bloco não confere")
+
+
+async def complete_session(session_id: str) -> Dict[str, Any]:
+    """
+    Finaliza a sessão: confere o checksum do arquivo montado e o entrega
+    ao armazenamento (mesmo fluxo do upload direto). Repetir a chamada
+    após a conclusão retorna o mesmo resultado.
+
+    A finalização é reservada por UPLOAD_COMPLETE_LEASE: se a tentativa
+    anterior foi interrompida sem reabrir a sessão (processo encerrado),
+    uma nova chamada assume depois do prazo.
+    """
+    sessions_col = await get_upload_sessions_collection()
+    session = await get_session(session_id)
+    now = datetime.utcnow()
+
+    if session["status"] == COMPLETED:
+        return session
+    if session["status"] == COMPLETING and not _complete_lease_expired(session, now):
+        raise HTTPException(status_code=409, detail="Sessão de upload já está sendo finalizada")
+
+    # Transição atômica: só uma finalização, e só com todos os blocos
+    token = str(uuid.uuid4())
+    session = await sessions_col.find_one_and_update(
+        {
+            "id": session_id,
+            "receivedChunks": {"$size": session["totalChunks"]},
+            "$or": [
+                {"status": OPEN},
+                {"status": COMPLETING, "completeLease.until": {"$lt": now}},
+                # Finalização gravada antes da reserva existir
+                {
+                    "status": COMPLETING,
+                    "completeLease": None,
+                    "updatedAt": {"$lt": now - timedelta(seconds=UPLOAD_COMPLETE_LEASE)}
+                }
+            ]
+        },
+        {"$set": {
+            "status": COMPLETING,
+            "completeLease": {"token": token, "until": now + timedelta(seconds=UPLOAD_COMPLETE_LEASE)},
+            "updatedAt": now,
+            "expiresAt": _expires_at()
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    if not session:
+        current = await get_session(session_id)
+        if current["status"] == COMPLETED:
+            return current
+        if current["status"] == COMPLETING:
+            raise HTTPException(status_code=409, detail="Sessão de upload já está sendo finalizada")
+        status = session_status(current)
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incompleto: {len(status['missingChunks'])} blocos pendentes"
+        )
+
+    path = session_path(session_id)
+    staged_path = f"{path}.{int(time.time() * 1000)}.link"
+
+    try:
+        digest = await run_in_threadpool(hash_file, path)
+
+        if session.get("sha256") and digest["sha256"] != session["sha256"]:
+            # Algum bloco chegou corrompido: recomeçar o envio dos blocos
+            await sessions_col.update_one(
+                {"id": session_id, "completeLease.token": token},
+                {
+                    "$set": {"status": OPEN, "receivedChunks": [], "updatedAt": datetime.utcnow()},
+                    "$unset": {"completeLease": ""}
+                }
+            )
+            raise HTTPException(status_code=422, detail="Checksum do arquivo não confere; reenvie os blocos")
+
+        content_type = sniff_content_type(digest["head"])
+        if content_type is None or not content_type.startswith(f"{session['kind']}/"):
+            await abort_session(session_id)
+            raise HTTPException(status_code=400, detail="Conteúdo do arquivo não corresponde ao tipo informado")
+
+        # Link para o armazenamento consumir; o arquivo da sessão continua
+        # disponível para nova tentativa se o envio falhar
+        await run_in_threadpool(os.link, path, staged_path)
+
+        staged = StagedUpload(staged_path, session["size"], digest["sha256"], content_type)
+
+        media = await store_upload(staged, session["folder"], session["kind"])
+
+    except HTTPException as e:
+        # 409: mesma mídia em remoção (acquire_media); pode tentar de novo
+        if e.status_code >= 500 or e.status_code == 409:
+            await _reopen(session_id, token)
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao finalizar sessão de upload {session_id}: {str(e)}")
+        await _reopen(session_id, token)
+        raise HTTPException(status_code=500, detail="Erro ao finalizar upload")
+    except BaseException:
+        # Cancelamento (ex.: cliente desconectou): a sessão volta a aceitar a finalização
+        await _reopen(session_id, token)
+        raise
+    finally:
+        _remove(staged_path)
+
+    _remove(path)
+    session = await sessions_col.find_one_and_update(
+        {"id": session_id},
+        {
+            "$set": {
+                "status": COMPLETED,
+                "url": media["url"],
+                "variants": media.get("variants", []),
+                "updatedAt": datetime.utcnow(),
+                "expiresAt": _expires_at()
+            },
+            "$unset": {"completeLease": ""}
+        },
+        return_document=ReturnDocument.AFTER
+    ) or {**session, "status": COMPLETED, "url": media["url"]}
+    session.pop("_id", None)
+
+    logger.info(f"Sessão de upload concluída: {session_id} -> {media['url']}")
+    return session
+
+
+def _complete_lease_expired(session: Dict[str, Any], now: datetime) -> bool:
+    lease = session.get("completeLease")
+    if lease:
+        return lease["until"] < now
+    return session["updatedAt"] < now - timedelta(seconds=UPLOAD_COMPLETE_LEASE)
+
+
+async def _reopen(session_id: str, token: str) -> None:
+    """
+    Volta a sessão para aberta após falha no armazenamento (blocos
+    preservados), se a finalização ainda pertence a esta tentativa
+    """
+    sessions_col = await get_upload_sessions_collection()
+    try:
+        await sessions_col.update_one(
+            {"id": session_id, "status": COMPLETING, "completeLease.token": token},
+            {"$set": {"status": OPEN, "updatedAt": datetime.utcnow()}, "$unset": {"completeLease": ""}}
+        )
+    except Exception as e:
+        # A reserva vence em UPLOAD_COMPLETE_LEASE e a sessão é retomada
+        logger.error(f"Erro ao reabrir sessão de upload {session_id}: {str(e)}")
+
+
+async def abort_session(session_id: str) -> bool:
+    """Cancela a sessão e remove o arquivo de staging"""
+    sessions_col = await get_upload_sessions_collection()
+    result = await sessions_col.delete_one({"id": session_id})
+    _remove(session_path(session_id))
+    return result.deleted_count == 1
+
+
+def _sweep_staging(live_ids: List[str], cutoff: float) -> int:
+    """Remove arquivos de staging antigos sem sessão ativa (ex.: processo encerrado no meio)"""
+    live_paths = {session_path(session_id) for session_id in live_ids}
+    removed = 0
+    try:
+        entries = list(os.scandir(UPLOAD_STAGING_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.path in live_paths:
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                # Diretórios: versões responsivas de um upload interrompido
+                if entry.is_dir():
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def gc_upload_sessions() -> None:
+    """Remove sessões expiradas e arquivos de staging abandonados"""
+    sessions_col = await get_upload_sessions_collection()
+    now = datetime.utcnow()
+
+    expired = await sessions_col.find({"expiresAt": {"$lt": now}}, {"_id": 0, "id": 1}).to_list(None)
+    removed_sessions = 0
+    for session in expired:
+        # Condição repetida: a sessão pode ter sido renovada nesse meio tempo
+        result = await sessions_col.delete_one({"id": session["id"], "expiresAt": {"$lt": now}})
+        if result.deleted_count:
+            _remove(session_path(session["id"]))
+            removed_sessions += 1
+
+    live = await sessions_col.find({}, {"_id": 0, "id": 1}).to_list(None)
+    removed_files = await run_in_threadpool(
+        _sweep_staging,
+        [session["id"] for session in live],
+        time.time() - UPLOAD_SESSION_TTL
+    )
+
+    if removed_sessions or removed_files:
+        logger.info(f"GC de uploads: {removed_sessions} sessões e {removed_files} arquivos temporários removidos")
@@ -44,14 +44,41 @@ async def create_indexes():
         await db.projects.create_index("featured")
         await db.projects.create_index("createdAt")
         await db.projects.create_index("client")
+        await db.projects.create_index([("featured", 1), ("createdAt", -1)])
         
         # Índices para clients
         await db.clients.create_index("active")
         await db.clients.create_index("order")
+        await db.clients.create_index([("active", 1), ("order", 1)])
         
         # Índices para messages
+        await db.messages.create_index("id")
         await db.messages.create_index("read")
         await db.messages.create_index("createdAt")
+        await db.messages.create_index([("createdAt", -1), ("id", -1)])
+        await db.messages.create_index([("read", 1), ("createdAt", -1), ("id", -1)])
+        await db.messages.create_index([("emailsQueued", 1), ("createdAt", 1)])
+        
+        # Índices para a fila de emails
+        await db.email_outbox.create_index("id", unique=True)
+        await db.email_outbox.create_index([("status", 1), ("nextAttemptAt", 1)])
+        await db.email_outbox.create_index("messageId")
+        
+        # Índices para idempotência (expiração por documento)
+        await db.idempotency_keys.create_index("key", unique=True)
+        await db.idempotency_keys.create_index("expiresAt", expireAfterSeconds=0)
+        
+        # Índices para mídia (endereçada pelo SHA-256 do conteúdo)
+        await db.media.create_index("hash", unique=True)
+        await db.media.create_index("url")
+        
+        # Índices para sessões de upload retomável (removidas pelo GC)
+        await db.upload_sessions.create_index("id", unique=True)
+        await db.upload_sessions.create_index("expiresAt")
+        
+        # Índices para uploads diretos ao armazenamento (expiração por documento)
+        await db.direct_uploads.create_index("id", unique=True)
+        await db.direct_uploads.create_index("expiresAt", expireAfterSeconds=0)
         
         # Índices para admin
         await db.admin_users.create_index("username", unique=True)
@@ -83,6 +110,41 @@ async def get_messages_collection():
     db = await get_database()
     return db.messages
 
+async def get_snapshot_collection():
+    """Retorna collection do snapshot público do portfólio"""
+    db = await get_database()
+    return db.portfolio_snapshot
+
+async def get_stats_collection():
+    """Retorna collection de contadores agregados"""
+    db = await get_database()
+    return db.stats
+
+async def get_outbox_collection():
+    """Retorna collection da fila de emails"""
+    db = await get_database()
+    return db.email_outbox
+
+async def get_idempotency_collection():
+    """Retorna collection das chaves de idempotência"""
+    db = await get_database()
+    return db.idempotency_keys
+
+async def get_media_collection():
+    """Retorna collection dos arquivos de mídia enviados"""
+    db = await get_database()
+    return db.media
+
+async def get_upload_sessions_collection():
+    """Retorna collection das sessões de upload retomável"""
+    db = await get_database()
+    return db.upload_sessions
+
+async def get_direct_uploads_collection():
+    """Retorna collection dos uploads diretos ao armazenamento"""
+    db = await get_database()
+    return db.direct_uploads
+
 async def get_admin_collection():
     """Retorna collection dos admins"""
     db = await get_database()
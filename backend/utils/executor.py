@@ -0,0 +1,131 @@
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Fila do executor cheia: a chamada foi rejeitada sem ser enfileirada"""
+
+    def __init__(self, name: str):
+        super().__init__(f"Executor {name} saturado")
+        self.name = name
+
+
+class BoundedExecutor:
+    """
+    Pool de threads dedicado com limite de fila e métricas, para tirar
+    trabalho bloqueante (CPU ou I/O síncrono) do event loop.
+
+    No máximo `max_workers` tarefas executam ao mesmo tempo e no máximo
+    `max_queue` aguardam; acima disso `run` levanta ExecutorSaturatedError.
+
+    Com `processes=True` usa um pool de processos (spawn), para trabalho
+    de CPU que precisa escalar entre núcleos; `fn` e os argumentos devem
+    ser serializáveis (funções de módulo).
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, processes: bool = False):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.processes = processes
+        if processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=name
+            )
+        self._pending = 0
+        self.metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+            "total_run_seconds": 0.0
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.max_workers)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Executa `fn(*args)` no pool e aguarda o resultado"""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.metrics["rejected"] += 1
+            raise ExecutorSaturatedError(self.name)
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        timings = {}
+
+        def job():
+            started = time.perf_counter()
+            timings["wait"] = started - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                timings["run"] = time.perf_counter() - started
+
+        def done(_):
+            # A thread pode terminar depois de um timeout; a vaga só é
+            # liberada quando ela realmente termina
+            if self.processes:
+                # Sem acesso ao início real no outro processo, o tempo
+                # total conta como execução
+                timings["run"] = time.perf_counter() - submitted_at
+            loop.call_soon_threadsafe(self._release, timings)
+
+        self._pending += 1
+        self.metrics["submitted"] += 1
+        self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], self.queue_depth)
+
+        if self.processes:
+            future = self._executor.submit(fn, *args)
+        else:
+            future = self._executor.submit(job)
+        future.add_done_callback(done)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.metrics["timed_out"] += 1
+            raise
+        except Exception:
+            self.metrics["failed"] += 1
+            raise
+
+        self.metrics["completed"] += 1
+        return result
+
+    def _release(self, timings: Dict[str, float]) -> None:
+        self._pending -= 1
+        self.metrics["total_wait_seconds"] += timings.get("wait", 0.0)
+        self.metrics["total_run_seconds"] += timings.get("run", 0.0)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        logger.info(f"Executor {self.name} encerrado")
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.metrics["completed"] + self.metrics["failed"] + self.metrics["timed_out"]
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._pending,
+            "queue_depth": self.queue_depth,
+            **{k: round(v, 4) if isinstance(v, float) else v for k, v in self.metrics.items()},
+            "avg_wait_ms": round(self.metrics["total_wait_seconds"] / finished * 1000, 2) if finished else 0.0,
+            "avg_run_ms": round(self.metrics["total_run_seconds"] / finished * 1000, 2) if finished else 0.0
+        }
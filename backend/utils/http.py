@@ -0,0 +1,229 @@
+import os
+import gzip
+import json
+import hashlib
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional, Union
+
+from fastapi import Request, Response
+
+# Dependências opcionais: encoder JSON rápido e compressão brotli
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "9"))
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "11"))
+
+# Preferência do servidor quando o cliente aceita mais de uma codificação
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+def make_etag(*parts: Any) -> str:
+    """Gera ETag forte a partir das partes que identificam a versão do conteúdo"""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def format_http_date(value: datetime) -> str:
+    """Formata datetime (UTC) no formato de data HTTP"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _etag_matches(header: str, etags: Iterable[str]) -> bool:
+    """Comparação fraca usada por If-None-Match (RFC 9110)"""
+    if header.strip() == "*":
+        return True
+    opaque = {_strip_weak(etag) for etag in etags}
+    return any(
+        _strip_weak(candidate.strip()) in opaque
+        for candidate in header.split(",")
+    )
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(
+    request: Request,
+    etag: Union[str, Iterable[str]],
+    last_modified: Optional[datetime] = None
+) -> bool:
+    """
+    Verifica If-None-Match / If-Modified-Since. If-Modified-Since só é
+    considerado quando o cliente não envia If-None-Match. `etag` pode ser
+    uma lista com os ETags de todas as representações da versão atual.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = [etag] if isinstance(etag, str) else etag
+        return _etag_matches(if_none_match, etags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        return _not_modified_since(if_modified_since, last_modified)
+
+    return False
+
+
+def validator_headers(
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "no-cache"
+) -> Dict[str, str]:
+    """Headers de validação de cache"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "no-cache"
+) -> Optional[Response]:
+    """
+    Aplica os headers de validação na resposta e retorna um 304 pronto
+    quando o cliente já possui a versão atual (None caso contrário)
+    """
+    headers = validator_headers(etag, last_modified, cache_control)
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_json(payload: Any) -> bytes:
+    """
+    Serializa para JSON no mesmo formato da resposta padrão do FastAPI
+    (datetimes em ISO 8601), usando orjson quando disponível
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default)
+    return json.dumps(
+        payload,
+        default=_json_default,
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def select_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """Escolhe a codificação a partir do Accept-Encoding e das variantes disponíveis"""
+    if not accept_encoding:
+        return "identity"
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    candidates = []
+    for rank, encoding in enumerate(ENCODING_PREFERENCE):
+        if encoding not in available:
+            continue
+        # identity é aceitável salvo exclusão explícita
+        default = 1.0 if encoding == "identity" else 0.0
+        q = weights.get(encoding, weights.get("*", default))
+        if q > 0:
+            candidates.append((q, -rank, encoding))
+
+    return max(candidates)[2] if candidates else "identity"
+
+
+class EncodedPayload:
+    """
+    Payload JSON serializado uma única vez por versão de conteúdo, com as
+    variantes identity/gzip/brotli prontas para envio
+    """
+
+    def __init__(
+        self,
+        payload: Any,
+        version_parts: Iterable[Any],
+        last_modified: Optional[datetime] = None,
+        cache_control: str = "no-cache"
+    ):
+        version_parts = tuple(version_parts)
+        body = dumps_json(payload)
+
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if len(compressed) < len(body):
+            self.bodies["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+            if len(compressed) < len(body):
+                self.bodies["br"] = compressed
+
+        # Cada representação tem seu próprio ETag forte
+        self.etags = {
+            encoding: make_etag(*version_parts, encoding)
+            for encoding in self.bodies
+        }
+        self.last_modified = last_modified
+        self.cache_control = cache_control
+
+    def to_response(self, request: Request) -> Response:
+        """Monta a resposta (200 ou 304) sem nenhum trabalho de serialização"""
+        encoding = select_encoding(request.headers.get("accept-encoding"), self.bodies)
+
+        headers = validator_headers(self.etags[encoding], self.last_modified, self.cache_control)
+        headers["Vary"] = "Accept-Encoding"
+
+        if is_not_modified(request, self.etags.values(), self.last_modified):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        return Response(
+            content=self.bodies[encoding],
+            media_type="application/json",
+            headers=headers
+        )
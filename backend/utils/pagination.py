@@ -0,0 +1,84 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Direções do cursor: "n" (próxima página, mais antigas) e "p" (anterior, mais novas)
+NEXT = "n"
+PREV = "p"
+
+
+def encode_cursor(document: Dict[str, Any], direction: str) -> str:
+    """Gera cursor opaco a partir de (createdAt, id) do documento"""
+    raw = json.dumps({
+        "d": direction,
+        "c": document["createdAt"].isoformat(),
+        "i": document["id"]
+    }, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, datetime, str]:
+    """Decodifica cursor opaco; cursor inválido gera 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        direction = data["d"]
+        if direction not in (NEXT, PREV):
+            raise ValueError("direção inválida")
+        return direction, datetime.fromisoformat(data["c"]), str(data["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def keyset_query(
+    base_filter: Dict[str, Any],
+    cursor: Optional[str]
+) -> Tuple[Dict[str, Any], List[Tuple[str, int]], str]:
+    """
+    Monta filtro e ordenação para paginação por (createdAt, id), do mais
+    novo para o mais antigo. Retorna (filtro, sort, direção).
+    """
+    if not cursor:
+        return dict(base_filter), [("createdAt", -1), ("id", -1)], NEXT
+
+    direction, created_at, doc_id = decode_cursor(cursor)
+    op, order = ("$lt", -1) if direction == NEXT else ("$gt", 1)
+
+    query = dict(base_filter)
+    query["$or"] = [
+        {"createdAt": {op: created_at}},
+        {"createdAt": created_at, "id": {op: doc_id}}
+    ]
+    return query, [("createdAt", order), ("id", order)], direction
+
+
+def build_page(
+    documents: List[Dict[str, Any]],
+    limit: int,
+    direction: str,
+    has_cursor: bool
+) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+    """
+    Recebe até limit + 1 documentos na ordem da consulta e retorna
+    (documentos em ordem decrescente, cursor next, cursor prev)
+    """
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+
+    if direction == PREV:
+        documents.reverse()
+
+    if not documents:
+        return documents, None, None
+
+    if direction == NEXT:
+        has_next, has_prev = has_more, has_cursor
+    else:
+        has_next, has_prev = True, has_more
+
+    next_cursor = encode_cursor(documents[-1], NEXT) if has_next else None
+    prev_cursor = encode_cursor(documents[0], PREV) if has_prev else None
+    return documents, next_cursor, prev_cursor
@@ -0,0 +1,184 @@
+import os
+import json
+import math
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configurações do rate limiting
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "10000"))
+# Usar X-Forwarded-For apenas atrás de proxy confiável
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+# Proxies confiáveis na frente da aplicação: cada um acrescenta um endereço
+# à direita do X-Forwarded-For; os da esquerda vêm do cliente e são ignorados
+RATE_LIMIT_TRUSTED_HOPS = max(1, int(os.environ.get("RATE_LIMIT_TRUSTED_HOPS", "1")))
+
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """Converte "capacidade/segundos" (ex.: "5/60") em (capacidade, tokens por segundo)"""
+    capacity, _, period = value.partition("/")
+    capacity = int(capacity)
+    period = float(period or 1)
+    return capacity, capacity / period
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Limite de uma rota: balde por IP e, opcionalmente, balde global da rota"""
+    name: str
+    method: str
+    path: str
+    per_ip: Tuple[int, float]
+    per_route: Optional[Tuple[int, float]] = None
+
+
+class RateLimitBackend(ABC):
+    """Armazenamento dos baldes; permite compartilhar limites entre workers"""
+
+    @abstractmethod
+    async def acquire(self, key: str, capacity: int, refill_rate: float) -> float:
+        """Consome um token. Retorna 0 se permitido ou os segundos até haver token."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets em memória: O(1) por chave ativa, com remoção LRU das
+    chaves menos usadas quando `max_keys` é atingido
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max(1, max_keys)
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.evictions = 0
+
+    async def acquire(self, key: str, capacity: int, refill_rate: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = [float(capacity), now]
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._buckets.move_to_end(key)
+            tokens, last = bucket
+            bucket[0] = min(float(capacity), tokens + (now - last) * refill_rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+
+        return (1.0 - bucket[0]) / refill_rate if refill_rate > 0 else float("inf")
+
+    def stats(self) -> Dict[str, int]:
+        return {"active_keys": len(self._buckets), "evictions": self.evictions}
+
+
+def default_rules() -> Tuple[RateLimitRule, ...]:
+    """Rotas limitadas por padrão (sobrescritas via variáveis de ambiente)"""
+    return (
+        RateLimitRule(
+            name="contact",
+            method="POST",
+            path="/api/contact",
+            per_ip=parse_limit(os.environ.get("RATE_LIMIT_CONTACT", "5/60")),
+            per_route=parse_limit(os.environ.get("RATE_LIMIT_CONTACT_GLOBAL", "120/60"))
+        ),
+        RateLimitRule(
+            name="admin_login",
+            method="POST",
+            path="/api/admin/login",
+            per_ip=parse_limit(os.environ.get("RATE_LIMIT_LOGIN", "10/300")),
+            per_route=parse_limit(os.environ.get("RATE_LIMIT_LOGIN_GLOBAL", "60/60"))
+        ),
+    )
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que responde 429 com Retry-After quando o limite estoura"""
+
+    def __init__(
+        self,
+        app,
+        rules: Optional[Iterable[RateLimitRule]] = None,
+        backend: Optional[RateLimitBackend] = None,
+        enabled: bool = RATE_LIMIT_ENABLED
+    ):
+        self.app = app
+        self.enabled = enabled
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.rules = {
+            (rule.method, rule.path.rstrip("/")): rule
+            for rule in (rules if rules is not None else default_rules())
+        }
+        self.limited = 0
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.rules.get((scope["method"], scope["path"].rstrip("/")))
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self._check(rule, scope)
+        if retry_after > 0:
+            self.limited += 1
+            await self._reject(send, retry_after)
+            return
+
+        await self.app(scope, receive, send)
+
+    async def _check(self, rule: RateLimitRule, scope) -> float:
+        client_ip = self._client_ip(scope)
+
+        retry_after = await self.backend.acquire(f"{rule.name}:ip:{client_ip}", *rule.per_ip)
+        if retry_after > 0:
+            return retry_after
+
+        if rule.per_route is not None:
+            return await self.backend.acquire(f"{rule.name}:route", *rule.per_route)
+
+        return 0.0
+
+    def _client_ip(self, scope) -> str:
+        if RATE_LIMIT_TRUST_PROXY:
+            # Endereço acrescentado pelo proxy confiável mais externo
+            forwarded = [
+                address.strip()
+                for name, value in scope.get("headers", [])
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+                if address.strip()
+            ]
+            if len(forwarded) >= RATE_LIMIT_TRUSTED_HOPS:
+                return forwarded[-RATE_LIMIT_TRUSTED_HOPS]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _reject(self, send, retry_after: float) -> None:
+        body = json.dumps(
+            {"detail": "Muitas requisições. Tente novamente em instantes."},
+            ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
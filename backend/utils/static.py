@@ -0,0 +1,156 @@
+import os
+import re
+import stat
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Leitura em blocos quando o servidor ASGI não oferece envio zero-copy
+STATIC_CHUNK_SIZE = int(os.environ.get("STATIC_CHUNK_SIZE", str(256 * 1024)))
+
+# Sidecars pré-comprimidos (arquivo.ext.br / arquivo.ext.gz)
+SIDECAR_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Range fora do tamanho do arquivo (responder 416)"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta um Range de intervalo único ("bytes=a-b", "bytes=a-",
+    "bytes=-n") e retorna (início, fim inclusivo). Retorna None quando o
+    header deve ser ignorado (ausente, inválido ou com vários intervalos,
+    respondidos com o arquivo inteiro).
+    """
+    if not header:
+        return None
+
+    match = _RANGE_RE.match(header.strip().replace(" ", ""))
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Sufixo: últimos `n` bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class RangedFileResponse(Response):
+    """
+    Envia um trecho (ou todo) de um arquivo sem carregá-lo em memória.
+
+    Usa, nessa ordem: X-Accel-Redirect (`accel_path`, o nginx faz o
+    sendfile), a extensão ASGI `http.response.zerocopy` (sendfile no
+    servidor), `http.response.pathsend` (arquivo inteiro) e, por fim,
+    leitura em blocos de STATIC_CHUNK_SIZE.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: Optional[str] = None,
+        content_range: Optional[Tuple[int, int]] = None,
+        accel_path: Optional[str] = None,
+        background: Optional[BackgroundTask] = None
+    ):
+        self.path = path
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self.accel_path = accel_path
+
+        size = stat_result.st_size
+        self.offset, last = content_range if content_range else (0, size - 1)
+        self.count = max(0, last - self.offset + 1)
+
+        self.init_headers(headers)
+        self.headers.setdefault("accept-ranges", "bytes")
+        self.headers.setdefault("last-modified", formatdate(stat_result.st_mtime, usegmt=True))
+        if content_range:
+            self.headers["content-range"] = f"bytes {self.offset}-{last}/{size}"
+
+        if accel_path:
+            # O nginx calcula tamanho e Range a partir do arquivo
+            self.headers["x-accel-redirect"] = accel_path
+            self.headers["content-length"] = "0"
+        else:
+            self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+
+        extensions = scope.get("extensions") or {}
+
+        if scope["method"].upper() == "HEAD" or self.accel_path or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopy" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False
+                })
+        elif "http.response.pathsend" in extensions and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": self.path})
+        else:
+            await self._send_chunks(send)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_chunks(self, send: Send) -> None:
+        remaining = self.count
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.offset)
+            while remaining > 0:
+                chunk = await file.read(min(STATIC_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0
+                })
+        if remaining > 0:
+            # Arquivo encolheu durante o envio: encerrar a resposta
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def stat_regular_file(path: str) -> Optional[os.stat_result]:
+    """stat do arquivo, ou None se não existir ou não for arquivo regular"""
+    try:
+        result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return result if stat.S_ISREG(result.st_mode) else None
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Tarefas em segundo plano iniciadas no lifespan
+_background_tasks: List[asyncio.Task] = []
+
+
+def start_periodic_task(
+    name: str,
+    interval_seconds: float,
+    job: Callable[[], Awaitable[None]],
+    run_immediately: bool = False
+) -> asyncio.Task:
+    """Executa `job` a cada `interval_seconds` até o encerramento da aplicação"""
+    async def runner():
+        if not run_immediately:
+            await asyncio.sleep(interval_seconds)
+        while True:
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na tarefa periódica {name}: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    task = asyncio.create_task(runner(), name=name)
+    _background_tasks.append(task)
+    logger.info(f"Tarefa periódica iniciada: {name} (a cada {interval_seconds}s)")
+    return task
+
+
+async def stop_background_tasks() -> None:
+    """Cancela as tarefas periódicas e aguarda o término"""
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
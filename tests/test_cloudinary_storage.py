@@ -0,0 +1,243 @@
+"""
+Backend Cloudinary contra um endpoint local de teste (HTTP real): envio em
+partes (upload_large), fila do executor dedicado e métricas de envio
+"""
+
+import os
+import re
+import sys
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+cloudinary = pytest.importorskip("cloudinary")
+
+from fastapi import HTTPException  # noqa: E402
+
+import services.storage as storage_module  # noqa: E402
+
+CLOUD_NAME = "demo"
+PUBLIC_ID_FIELD = re.compile(rb'name="public_id"\r\n\r\n([^\r]*)\r\n')
+
+
+class StubCloudinary:
+    """Servidor HTTP local no lugar da API do Cloudinary; registra as chamadas"""
+
+    def __init__(self):
+        self.calls = []
+        self.resources = {}  # "<resource_type>/<public_id>" -> bytes recebidos
+        self.gate = threading.Event()
+        self.gate.set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                _, _, _, resource_type, action = self.path.split("/")
+                match = PUBLIC_ID_FIELD.search(body)
+                public_id = match.group(1).decode() if match else ""
+                stub.calls.append({
+                    "action": action,
+                    "resource_type": resource_type,
+                    "public_id": public_id,
+                    "content_range": self.headers.get("Content-Range"),
+                    "upload_id": self.headers.get("X-Unique-Upload-Id")
+                })
+                stub.gate.wait(timeout=10)
+
+                key = f"{resource_type}/{public_id}"
+                if action == "destroy":
+                    found = stub.resources.pop(key, None) is not None
+                    self._reply(200, {"result": "ok" if found else "not found"})
+                    return
+
+                stub.resources[key] = stub.resources.get(key, 0) + len(body)
+                self._reply(200, {
+                    "public_id": public_id,
+                    "resource_type": resource_type,
+                    "secure_url": f"https://res.cloudinary.com/{CLOUD_NAME}/{resource_type}/upload/v1/{public_id}",
+                    "width": 640,
+                    "height": 360
+                })
+
+            def do_GET(self):
+                # /v1_1/<cloud>/resources/<resource_type>/upload/<public_id>
+                parts = self.path.split("?")[0].split("/")
+                key = f"{parts[4]}/{'/'.join(parts[6:])}"
+                if key not in stub.resources:
+                    self._reply(404, {"error": {"message": "Resource not found"}})
+                    return
+                self._reply(200, {
+                    "public_id": "/".join(parts[6:]),
+                    "format": "mp4",
+                    "bytes": stub.resources[key],
+                    "etag": "abc",
+                    "created_at": "2024-01-01T00:00:00Z"
+                })
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def uploads(self):
+        return [call for call in self.calls if call["action"] == "upload"]
+
+    def close(self):
+        self.gate.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubCloudinary()
+    config = cloudinary.config()
+    monkeypatch.setattr(config, "cloud_name", CLOUD_NAME, raising=False)
+    monkeypatch.setattr(config, "api_key", "key", raising=False)
+    monkeypatch.setattr(config, "api_secret", "secret", raising=False)
+    monkeypatch.setattr(config, "upload_prefix", stub.url, raising=False)
+
+    monkeypatch.setattr(storage_module, "CLOUDINARY_LARGE_THRESHOLD", 200_000)
+    monkeypatch.setattr(storage_module, "CLOUDINARY_CHUNK_SIZE", 100_000)
+    monkeypatch.setattr(storage_module, "CLOUDINARY_UPLOAD_TIMEOUT", 10)
+    monkeypatch.setattr(storage_module, "CLOUDINARY_DESTROY_TIMEOUT", 10)
+
+    yield stub
+    stub.close()
+
+
+def _backend(monkeypatch, max_workers=2, max_queue=4):
+    monkeypatch.setattr(storage_module, "CLOUDINARY_MAX_WORKERS", max_workers)
+    monkeypatch.setattr(storage_module, "CLOUDINARY_MAX_QUEUE", max_queue)
+    return storage_module.CloudinaryStorage()
+
+
+def test_large_video_is_uploaded_in_chunks(stub, monkeypatch):
+    backend = _backend(monkeypatch)
+    data = os.urandom(250_000)
+
+    async def scenario():
+        try:
+            return await backend.put_stream(
+                "gaffer-portfolio/videos/reel.mp4", BytesIO(data), len(data), "video/mp4",
+                resource_type="video"
+            )
+        finally:
+            backend.close()
+
+    stored = asyncio.run(scenario())
+    uploads = stub.uploads()
+    assert [call["content_range"] for call in uploads] == [
+        "bytes 0-99999/250000", "bytes 100000-199999/250000", "bytes 200000-249999/250000"
+    ]
+    assert len({call["upload_id"] for call in uploads}) == 1
+    assert stored.key == "video/gaffer-portfolio/videos/reel"
+    assert stored.url.endswith("/video/upload/v1/gaffer-portfolio/videos/reel")
+
+    stats = backend.stats()
+    assert stats["uploads"] == 1
+    assert stats["chunked_uploads"] == 1
+    assert stats["bytes_uploaded"] == len(data)
+    assert stats["throughput_mb_s"] > 0
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_small_upload_is_sent_in_one_request(stub, monkeypatch):
+    backend = _backend(monkeypatch)
+    data = os.urandom(50_000)
+
+    async def scenario():
+        try:
+            await backend.put_stream("gaffer-portfolio/a.jpg", BytesIO(data), len(data), "image/jpeg")
+            # Vídeo abaixo do limite também vai em uma requisição
+            await backend.put_stream(
+                "gaffer-portfolio/b.mp4", BytesIO(data), len(data), "video/mp4", resource_type="video"
+            )
+        finally:
+            backend.close()
+
+    asyncio.run(scenario())
+    assert [call["content_range"] for call in stub.uploads()] == [None, None]
+    assert backend.stats()["chunked_uploads"] == 0
+    assert backend.stats()["uploads"] == 2
+
+
+def test_executor_queue_depth_and_saturation(stub, monkeypatch):
+    backend = _backend(monkeypatch, max_workers=1, max_queue=1)
+    stub.gate.clear()
+
+    async def upload(name):
+        return await backend.put_stream(f"gaffer-portfolio/{name}.jpg", BytesIO(b"x" * 100), 100, "image/jpeg")
+
+    async def scenario():
+        try:
+            running = asyncio.create_task(upload("a"))
+            queued = asyncio.create_task(upload("b"))
+            await asyncio.sleep(0.2)
+            during = backend.stats()
+
+            # Um executando e um na fila: o terceiro é recusado sem bloquear
+            with pytest.raises(HTTPException) as rejected:
+                await upload("c")
+
+            stub.gate.set()
+            await asyncio.gather(running, queued)
+            return during, rejected.value
+        finally:
+            backend.close()
+
+    during, rejected = asyncio.run(scenario())
+    assert during["in_flight"] == 2
+    assert during["queue_depth"] == 1
+    assert rejected.status_code == 503
+
+    stats = backend.stats()
+    assert stats["max_queue_depth"] == 1
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["avg_wait_ms"] > 0
+    assert len(stub.uploads()) == 2
+
+
+def test_stat_and_delete(stub, monkeypatch):
+    backend = _backend(monkeypatch)
+
+    async def scenario():
+        try:
+            stored = await backend.put_stream(
+                "gaffer-portfolio/videos/clip.mp4", BytesIO(b"v" * 1000), 1000, "video/mp4",
+                resource_type="video"
+            )
+            found = await backend.stat(stored.key)
+            deleted = await backend.delete(stored.key)
+            return stored, found, deleted, await backend.stat(stored.key), await backend.delete(stored.key)
+        finally:
+            backend.close()
+
+    stored, found, deleted, missing, deleted_again = asyncio.run(scenario())
+    assert found.key == stored.key
+    assert found.content_type == "video/mp4"
+    assert found.modified is not None
+    assert deleted is True
+    assert missing is None
+    assert deleted_again is False
+    assert backend.stats()["deletes"] == 1
+    assert backend.key_for_url(stored.url) == stored.key
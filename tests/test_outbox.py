@@ -0,0 +1,286 @@
+"""
+Worker da fila de emails contra um endpoint EmailJS de teste (HTTP real):
+retentativas com backoff, descarte em `dead` e adiamento com o circuito aberto
+"""
+
+import os
+import sys
+import json
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import utils.database as database_module  # noqa: E402
+import services.email as email_service  # noqa: E402
+import services.outbox as outbox  # noqa: E402
+from models.message import ContactMessage  # noqa: E402
+from services.circuit_breaker import CircuitBreaker  # noqa: E402
+from services.http_client import http_client  # noqa: E402
+
+
+class StubEmailJS:
+    """Servidor HTTP local no lugar do EmailJS; respostas programadas por template"""
+
+    def __init__(self):
+        self.statuses = defaultdict(list)  # template_id -> status das próximas respostas
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.calls.append(payload)
+                queued = stub.statuses[payload["template_id"]]
+                status = queued.pop(0) if queued else 200
+                self.send_response(status)
+                self.end_headers()
+                self.wfile.write(b"OK" if status == 200 else b"error")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1.0/email/send"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def calls_for(self, template_id):
+        return [call for call in self.calls if call["template_id"] == template_id]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def emailjs(monkeypatch):
+    stub = StubEmailJS()
+
+    monkeypatch.setattr(email_service, "EMAILJS_URL", stub.url)
+    monkeypatch.setattr(email_service, "EMAILJS_TEMPLATE_ID", "contact")
+    monkeypatch.setenv("EMAILJS_NOTIFICATION_TEMPLATE", "admin")
+    # Circuito que não abre, salvo quando o teste troca o breaker
+    monkeypatch.setattr(email_service, "emailjs_breaker", CircuitBreaker("emailjs-test", minimum_calls=1000))
+
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(outbox, "OUTBOX_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(outbox, "OUTBOX_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(outbox, "OUTBOX_ENQUEUE_GRACE", 0)
+    monkeypatch.setattr(outbox, "ADMIN_DIGEST_WINDOW", 0.05)
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(database_module.database, "client", client)
+    monkeypatch.setattr(database_module.database, "database", client["outbox_test"])
+
+    yield stub
+    stub.close()
+
+
+async def _create_message(enqueue=True):
+    message = ContactMessage(name="Ana", email="ana@example.com", subject="Orçamento", message="Olá")
+    messages_col = await database_module.get_messages_collection()
+    await messages_col.insert_one(message.dict())
+    if enqueue:
+        await outbox.enqueue_message_emails(message.id)
+    return message
+
+
+async def _job(message_id, kind=outbox.KIND_CONTACT):
+    outbox_col = await database_module.get_outbox_collection()
+    return await outbox_col.find_one({"id": outbox.outbox_id(message_id, kind)}, {"_id": 0})
+
+
+async def _run_worker(monkeypatch, condition, timeout=5.0):
+    """Executa o worker até `condition()` ser verdadeira e o encerra"""
+    worker = outbox.OutboxWorker()
+    monkeypatch.setattr(outbox, "outbox_worker", worker)
+    worker.start()
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not await condition():
+            assert asyncio.get_running_loop().time() < deadline, "condição não atingida a tempo"
+            await asyncio.sleep(0.02)
+    finally:
+        await worker.stop(timeout=2)
+        await http_client.close()
+    return worker
+
+
+def test_enqueue_is_idempotent_per_message(emailjs):
+    async def scenario():
+        message = await _create_message()
+        await outbox.enqueue_message_emails(message.id)
+
+        outbox_col = await database_module.get_outbox_collection()
+        kinds = sorted([job["kind"] async for job in outbox_col.find({"messageId": message.id})])
+        messages_col = await database_module.get_messages_collection()
+        stored = await messages_col.find_one({"id": message.id})
+        return kinds, stored["emailsQueued"]
+
+    kinds, queued = asyncio.run(scenario())
+    assert kinds == [outbox.KIND_ADMIN_NOTIFICATION, outbox.KIND_CONTACT]
+    assert queued is True
+
+
+def test_retries_with_backoff_until_sent(emailjs, monkeypatch):
+    emailjs.statuses["contact"] = [500, 500]
+
+    async def scenario():
+        message = await _create_message()
+
+        async def sent():
+            job = await _job(message.id)
+            return job["status"] == outbox.SENT
+
+        worker = await _run_worker(monkeypatch, sent)
+        return await _job(message.id), await _job(message.id, outbox.KIND_ADMIN_NOTIFICATION), worker
+
+    job, notification, worker = asyncio.run(scenario())
+    assert job["attempts"] == 2
+    assert job["sentAt"] is not None
+    assert len(emailjs.calls_for("contact")) == 3
+    assert notification["status"] == outbox.SENT
+    assert worker.metrics["failed"] == 2
+
+
+def test_dead_letter_after_max_attempts(emailjs, monkeypatch):
+    emailjs.statuses["contact"] = [500] * 10
+
+    async def scenario():
+        message = await _create_message()
+
+        async def dead():
+            job = await _job(message.id)
+            return job["status"] == outbox.DEAD
+
+        worker = await _run_worker(monkeypatch, dead)
+        return await _job(message.id), worker
+
+    job, worker = asyncio.run(scenario())
+    assert job["attempts"] == outbox.OUTBOX_MAX_ATTEMPTS
+    assert job["lastError"] == "Falha no envio"
+    assert len(emailjs.calls_for("contact")) == outbox.OUTBOX_MAX_ATTEMPTS
+    assert worker.metrics["dead"] == 1
+
+
+def test_open_circuit_defers_without_consuming_attempts(emailjs, monkeypatch):
+    # Primeira falha abre o circuito; a nova tentativa é adiada, não contada
+    breaker = CircuitBreaker("emailjs-test", minimum_calls=1, failure_rate_threshold=0.5, open_seconds=60)
+    monkeypatch.setattr(email_service, "emailjs_breaker", breaker)
+    emailjs.statuses["contact"] = [500]
+
+    async def scenario():
+        message = await _create_message()
+
+        async def deferred():
+            job = await _job(message.id)
+            return job["status"] == outbox.PENDING and job["nextAttemptAt"] > datetime.utcnow() + timedelta(seconds=30)
+
+        worker = await _run_worker(monkeypatch, deferred)
+        return await _job(message.id), worker
+
+    job, worker = asyncio.run(scenario())
+    assert job["attempts"] == 1
+    assert len(emailjs.calls_for("contact")) == 1
+    assert breaker.rejected >= 1
+    assert worker.metrics["deferred"] >= 1
+
+
+def test_worker_enqueues_messages_left_without_emails(emailjs, monkeypatch):
+    async def scenario():
+        message = await _create_message(enqueue=False)
+
+        async def sent():
+            job = await _job(message.id)
+            return job is not None and job["status"] == outbox.SENT
+
+        await _run_worker(monkeypatch, sent)
+        messages_col = await database_module.get_messages_collection()
+        return await messages_col.find_one({"id": message.id})
+
+    stored = asyncio.run(scenario())
+    assert stored["emailsQueued"] is True
+    assert len(emailjs.calls_for("contact")) == 1
+
+
+def test_status_write_failure_after_send_does_not_resend(emailjs, monkeypatch):
+    async def scenario():
+        message = await _create_message()
+        worker = outbox.OutboxWorker()
+        original_finish = worker._finish
+
+        async def failing_finish(job, status, *args, **kwargs):
+            if status == outbox.SENT and job["kind"] == outbox.KIND_CONTACT:
+                raise RuntimeError("banco indisponível")
+            return await original_finish(job, status, *args, **kwargs)
+
+        monkeypatch.setattr(worker, "_finish", failing_finish)
+        monkeypatch.setattr(outbox, "outbox_worker", worker)
+        worker.start()
+        try:
+            await asyncio.sleep(0.5)
+            running = worker.stats()["running"]
+        finally:
+            await worker.stop(timeout=2)
+            await http_client.close()
+        return await _job(message.id), running
+
+    job, running = asyncio.run(scenario())
+    # Enviado uma única vez; o item espera o OUTBOX_LOCK_TIMEOUT em "sending"
+    assert len(emailjs.calls_for("contact")) == 1
+    assert job["status"] == outbox.SENDING
+    assert job["attempts"] == 0
+    assert running is True
+
+
+def test_worker_survives_queue_write_errors(emailjs, monkeypatch):
+    emailjs.statuses["contact"] = [500]
+    monkeypatch.setattr(outbox, "OUTBOX_ERROR_BACKOFF", 0.01)
+
+    async def scenario():
+        message = await _create_message()
+        worker = outbox.OutboxWorker()
+        original_retry = worker._retry_or_dead
+        failures = []
+
+        async def flaky_retry(job, error):
+            if not failures:
+                failures.append(job["id"])
+                raise RuntimeError("banco indisponível")
+            return await original_retry(job, error)
+
+        async def flaky_idle_timeout():
+            # Falha fora das entregas: o laço principal deve seguir após a pausa
+            if len(failures) == 1:
+                failures.append("idle")
+                raise RuntimeError("banco indisponível")
+            return 0.05
+
+        monkeypatch.setattr(worker, "_retry_or_dead", flaky_retry)
+        monkeypatch.setattr(worker, "_idle_timeout", flaky_idle_timeout)
+        monkeypatch.setattr(outbox, "outbox_worker", worker)
+        worker.start()
+        try:
+            # Item preso em "sending" volta à fila pelo OUTBOX_LOCK_TIMEOUT
+            monkeypatch.setattr(outbox, "OUTBOX_LOCK_TIMEOUT", 0)
+            deadline = asyncio.get_running_loop().time() + 5
+            while (await _job(message.id))["status"] != outbox.SENT:
+                assert asyncio.get_running_loop().time() < deadline, "item não foi entregue"
+                await asyncio.sleep(0.02)
+            running = worker.stats()["running"]
+        finally:
+            await worker.stop(timeout=2)
+            await http_client.close()
+        return running, failures
+
+    running, failures = asyncio.run(scenario())
+    assert running is True
+    assert failures[1] == "idle"
+    assert len(emailjs.calls_for("contact")) == 2
@@ -0,0 +1,168 @@
+"""
+Contrato dos backends de armazenamento: os mesmos casos contra o disco
+local e contra um S3 local (servidor do moto, no papel de um MinIO)
+"""
+
+import os
+import sys
+import asyncio
+from io import BytesIO
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import services.storage as storage_module  # noqa: E402
+
+BUCKET = "media-test"
+PART_SIZE = 5 * 1024 * 1024  # mínimo do S3 para partes de multipart
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    pytest.importorskip("boto3")
+    moto_server = pytest.importorskip("moto.server")
+
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+def _local_backend(tmp_path, monkeypatch):
+    backend = storage_module.LocalStorage(root=str(tmp_path))
+
+    async def read(key):
+        with open(os.path.join(str(tmp_path), key), "rb") as f:
+            return f.read()
+
+    return backend, read
+
+
+def _s3_backend(tmp_path, monkeypatch, endpoint):
+    monkeypatch.setenv("S3_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("S3_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setattr(storage_module, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(storage_module, "S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setattr(storage_module, "S3_PUBLIC_URL", "")
+    monkeypatch.setattr(storage_module, "S3_PART_SIZE", PART_SIZE)
+    monkeypatch.setattr(storage_module, "S3_MAX_CONCURRENCY", 4)
+
+    backend = storage_module.S3Storage()
+    # Bucket limpo a cada teste
+    try:
+        for page in backend.client.get_paginator("list_objects_v2").paginate(Bucket=BUCKET):
+            for item in page.get("Contents", []):
+                backend.client.delete_object(Bucket=BUCKET, Key=item["Key"])
+    except backend.client.exceptions.NoSuchBucket:
+        backend.client.create_bucket(Bucket=BUCKET)
+
+    async def read(key):
+        path = str(tmp_path / "download.bin")
+        await backend.get_file(key, path)
+        with open(path, "rb") as f:
+            return f.read()
+
+    return backend, read
+
+
+@pytest.fixture(params=["local", "s3"])
+def backend(request, tmp_path, monkeypatch):
+    if request.param == "local":
+        backend, read = _local_backend(tmp_path, monkeypatch)
+    else:
+        backend, read = _s3_backend(tmp_path, monkeypatch, request.getfixturevalue("s3_endpoint"))
+    yield backend, read
+    backend.close()
+
+
+def test_put_stream_stat_and_urls(backend):
+    backend, read = backend
+    data = os.urandom(4096)
+    key = "gaffer-portfolio/photos/a.jpg"
+
+    async def scenario():
+        stored = await backend.put_stream(key, BytesIO(data), len(data), "image/jpeg")
+        return stored, await backend.stat(key), await read(key)
+
+    stored, stat, content = asyncio.run(scenario())
+    assert stored.key == key
+    assert stored.size == len(data)
+    assert stored.url == backend.url_for(key)
+    assert backend.key_for_url(stored.url) == key
+    assert backend.key_for_url("https://example.com/other/a.jpg") is None
+
+    assert stat.key == key
+    assert stat.size == len(data)
+    assert stat.content_type == "image/jpeg"
+    assert stat.modified is not None
+    assert content == data
+
+    assert backend.stats()["uploads"] == 1
+    assert backend.stats()["bytes_uploaded"] == len(data)
+
+
+def test_put_file_above_part_size(backend, tmp_path):
+    backend, read = backend
+    # Acima de S3_PART_SIZE: multipart em paralelo no S3, rename no disco local
+    data = os.urandom(2 * PART_SIZE + 1024)
+    source = tmp_path / "staged.mp4"
+    source.write_bytes(data)
+    key = "gaffer-portfolio/videos/reel.mp4"
+
+    async def scenario():
+        stored = await backend.put_file(key, str(source), len(data), "video/mp4")
+        return stored, await backend.stat(key), await read(key)
+
+    stored, stat, content = asyncio.run(scenario())
+    assert stored.size == len(data)
+    assert stat.size == len(data)
+    assert stat.content_type == "video/mp4"
+    assert content == data
+    if backend.name == "s3":
+        # ETag de multipart: "<md5>-<partes>"
+        assert stat.etag.strip('"').endswith("-3")
+
+
+def test_stat_missing_returns_none(backend):
+    backend, _ = backend
+    assert asyncio.run(backend.stat("gaffer-portfolio/missing.jpg")) is None
+
+
+def test_delete_and_delete_many(backend):
+    backend, _ = backend
+    keys = [f"uploads/{name}.png" for name in ("a", "b", "c")]
+
+    async def scenario():
+        for key in keys:
+            await backend.put_stream(key, BytesIO(b"png"), 3, "image/png")
+        first = await backend.delete(keys[0])
+        again = await backend.delete(keys[0])
+        many = await backend.delete_many(keys[1:])
+        remaining = [await backend.stat(key) for key in keys]
+        return first, again, many, remaining
+
+    first, again, many, remaining = asyncio.run(scenario())
+    assert first is True
+    assert again is False
+    assert many == 2
+    assert remaining == [None, None, None]
+    assert backend.stats()["deletes"] == 3
+
+
+def test_list_objects_by_prefix_in_batches(backend):
+    backend, _ = backend
+    inside = [f"gaffer-portfolio/{i}.jpg" for i in range(5)]
+    outside = ["other-app/x.jpg"]
+
+    async def scenario():
+        for key in inside + outside:
+            await backend.put_stream(key, BytesIO(b"jpg"), 3, "image/jpeg")
+        return [batch async for batch in backend.list_objects(batch_size=2, prefix="gaffer-portfolio/")]
+
+    batches = asyncio.run(scenario())
+    assert all(len(batch) <= 2 for batch in batches)
+    listed = sorted(obj.key for batch in batches for obj in batch)
+    assert listed == sorted(inside)
+    assert all(obj.size == 3 and obj.modified is not None for batch in batches for obj in batch)